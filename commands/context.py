@@ -2,13 +2,17 @@
 Shared command context.
 """
 
-from dataclasses import dataclass
-from typing import Dict
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 
 from ..core.client import DanbooruClient
 from ..core.config import PluginConfig
+from ..core.image_store import ImageStore
+from ..core.image_transcode import ImageTranscoder
+from ..core.reachability import ReachabilityCache
 from ..services.registry import ServiceRegistry
 from .parser import CommandParser
+from .stats import CommandStats
 
 
 @dataclass
@@ -18,3 +22,7 @@ class CommandContext:
     services: ServiceRegistry
     help_messages: Dict[str, str]
     parser: CommandParser
+    stats: CommandStats = field(default_factory=CommandStats)
+    reachability: ReachabilityCache = field(default_factory=ReachabilityCache)
+    image_store: Optional[ImageStore] = None
+    transcoder: Optional[ImageTranscoder] = None
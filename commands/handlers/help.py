@@ -50,6 +50,7 @@ HELP_MESSAGES = {
 `/danbooru count <tags>` - 帖子计数
 `/danbooru status` - 系统状态
 `/danbooru clearcache` - 清理缓存（不含订阅/去重）
+`/danbooru cache stats` - 缓存命中率与容量统计
 `/danbooru api <method> <endpoint> ...` - 原始API调用（全量覆盖）
 `/danbooru call <service> <method> ...` - 调用服务方法（微服务入口）
 
@@ -171,6 +172,13 @@ HELP_MESSAGES = {
     "clearcache": """🧹 缓存清理帮助
 
 `/danbooru clearcache` - 清理缓存（不含订阅与去重数据）
+""",
+    "cache": """📊 缓存统计帮助
+
+`/danbooru cache stats` - 查看缓存统计（默认）
+`/danbooru cache clear` - 同 `/danbooru clearcache`
+
+统计按端点族列出命中率、命中/陈旧返回/负缓存/未命中次数、条目数与字节数、淘汰次数与平均条目年龄，可据此调整 TTL 与缓存容量。
 """,
     "api": """🧰 原始API调用帮助
 
@@ -2,7 +2,7 @@
 Misc command handlers.
 """
 
-from typing import Dict, AsyncIterator
+from typing import Any, Dict, AsyncIterator
 
 from astrbot.api.event import AstrMessageEvent, MessageEventResult
 
@@ -20,6 +20,7 @@ MESSAGES = {
     "invalid_post_id": "❌ 无效的帖子ID",
     "similar_failed": "❌ 搜索相似图片失败",
     "similar_empty": "⚠️ 未找到与帖子 #{post_id} 相似的图片",
+    "cache_usage": "用法: `/danbooru cache [stats|clear]`",
 }
 
 
@@ -31,6 +32,77 @@ def _format_bytes(size_bytes: int) -> str:
     return f"{size_bytes} B"
 
 
+def _format_age(seconds: float) -> str:
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}h"
+    if seconds >= 60:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds:.0f}s"
+
+
+def _format_cache_stats(stats: Dict[str, Any]) -> str:
+    memory = stats.get("memory", {})
+    lines = [
+        "📊 缓存统计\n",
+        f"🧠 内存: {memory.get('entries', 0)}/{memory.get('max_size', 0)} 条，"
+        f"{_format_bytes(memory.get('bytes', 0))}"
+        + (f"/{_format_bytes(memory['max_bytes'])}" if memory.get("max_bytes") else ""),
+        f"🗑️ 淘汰: {memory.get('evictions', 0)}（准入拒绝 {memory.get('admission_rejections', 0)}），"
+        f"过期: {memory.get('expirations', 0)}",
+    ]
+    if memory.get("compressed_entries"):
+        lines.append(
+            f"🗜️ 压缩: {memory['compressed_entries']} 条，节省 {_format_bytes(memory.get('compressed_bytes_saved', 0))}，"
+            f"解码 {memory.get('decodes', 0)} 次（平均 {memory.get('decode_ms_avg', 0)}ms）"
+        )
+    entities = stats.get("entities")
+    if entities:
+        lines.append(
+            f"🧩 实体: {entities.get('entries', 0)} 条，命中 {entities.get('hits', 0)} / 未命中 {entities.get('misses', 0)}"
+        )
+    disk = stats.get("disk")
+    if disk:
+        lines.append(
+            f"💾 磁盘: {disk.get('entries', 0)} 条，{_format_bytes(disk.get('bytes', 0))}，"
+            f"命中 {disk.get('hits', 0)} / 未命中 {disk.get('misses', 0)}"
+        )
+
+    families = stats.get("families", {})
+    if families:
+        lines.append("\n📂 端点族（命中/陈旧/负缓存/未命中）")
+        for family, item in families.items():
+            lines.append(
+                f"- {family or 'default'}: {item['hit_ratio']:.1%}"
+                f"（{item['hits']}/{item['stale']}/{item['negative']}/{item['misses']}），"
+                f"{item['entries']} 条 {_format_bytes(item['bytes'])}，淘汰 {item['evictions']}，"
+                f"平均年龄 {_format_age(item['avg_age'])}"
+            )
+    return "\n".join(lines)
+
+
+def _format_command_stats(stats: Dict[str, Any], reachability: Dict[str, Any]) -> str:
+    commands = stats.get("commands", {})
+    if not commands:
+        return ""
+    lines = ["⏱️ 命令耗时（首条回复 平均/p95，总耗时平均）"]
+    for name, item in commands.items():
+        lines.append(
+            f"- {name}: {item['first_avg']:.2f}s/{item['first_p95']:.2f}s，"
+            f"{item['total_avg']:.2f}s（{item['count']} 次）"
+        )
+    if stats.get("probes"):
+        lines.append(
+            f"🖼️ 图片检测: {stats['probes']} 次，可访问 {stats.get('accessible', 0)}，"
+            f"提前取消 {stats.get('probes_cancelled', 0)}"
+        )
+    if reachability.get("probes_avoided") or reachability.get("hosts_down"):
+        lines.append(
+            f"📶 可达性缓存: {reachability.get('entries', 0)} 条，避免检测 {reachability['probes_avoided']} 次"
+            f"（主机冷却 {reachability.get('host_skips', 0)}），冷却中主机 {reachability.get('hosts_down', 0)}"
+        )
+    return "\n".join(lines) + "\n"
+
+
 def register(ctx: CommandContext) -> Dict[str, Handler]:
     async def cmd_autocomplete(event: AstrMessageEvent, args: str) -> AsyncIterator[MessageEventResult]:
         if not args:
@@ -83,13 +155,40 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
             return
 
         stats = ctx.client.get_stats()
+        command_text = _format_command_stats(ctx.stats.snapshot(), ctx.reachability.get_stats())
+        if ctx.image_store:
+            images = ctx.image_store.get_stats()
+            command_text += (
+                f"🗃️ 本地图片: {images['entries']} 张，{_format_bytes(images['bytes'])}/"
+                f"{_format_bytes(images['max_bytes'])}，命中 {images['hits']}，"
+                f"下载 {images['downloads']} 次（{_format_bytes(images['download_bytes'])}）\n"
+            )
+        if ctx.transcoder:
+            transcode = ctx.transcoder.get_stats()
+            command_text += (
+                f"🪄 转码: {transcode['transcoded']} 张，{_format_bytes(transcode['bytes_in'])} → "
+                f"{_format_bytes(transcode['bytes_out'])}（{transcode['ratio']:.1f}x），"
+                f"平均 {transcode['avg_ms']}ms，原样发送 {transcode['passthrough']}\n"
+            )
+        limiter = stats.get("rate_limiter") or {}
+        if "fallbacks" in limiter:
+            command_text += (
+                f"🤝 共享速率限制: {'正常' if limiter.get('shared') else '暂用本进程令牌桶'}，"
+                f"出错回退 {limiter['fallbacks']} 次\n"
+            )
+        if command_text:
+            command_text += "\n"
         info = f"""📈 Danbooru 插件状态
 
 🌐 API: {ctx.config.api.active_url if ctx.config else 'unknown'}
 🔐 已认证: {'是' if stats.get('is_authenticated') else '否'}
 📡 请求次数: {stats.get('request_count', 0)}
+🔗 合并请求: {stats.get('coalesced_count', 0)}
+🕒 后台刷新: {stats.get('stale_refreshes', 0)}
+🚫 负缓存命中: {stats.get('negative_cache', {}).get('hits', 0)}
+♻️ 条件请求命中: {stats.get('revalidated_count', 0)}（节省 {_format_bytes(stats.get('revalidated_bytes_saved', 0))}）
 
-✅ 服务正常运行
+{command_text}✅ 服务正常运行
 """
         yield event.plain_result(info)
 
@@ -98,10 +197,26 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
         count = stats.get("count", 0)
         size_bytes = stats.get("size_bytes", 0)
         size_text = _format_bytes(int(size_bytes))
+        disk_text = ""
+        if "disk_count" in stats:
+            disk_size = _format_bytes(int(stats.get("disk_size_bytes", 0)))
+            disk_text = f"，磁盘 {stats.get('disk_count', 0)} 条，约 {disk_size}"
         yield event.plain_result(
-            f"🧹 已清理缓存: {count} 条，约 {size_text}（不含订阅与去重数据）"
+            f"🧹 已清理缓存: {count} 条，约 {size_text}{disk_text}（不含订阅与去重数据）"
         )
 
+    async def cmd_cache(event: AstrMessageEvent, args: str) -> AsyncIterator[MessageEventResult]:
+        action = (args or "").strip().lower() or "stats"
+        if action == "clear":
+            async for result in cmd_clear_cache(event, ""):
+                yield result
+            return
+        if action != "stats":
+            yield event.plain_result(MESSAGES["cache_usage"])
+            return
+        stats = await ctx.client.get_cache_stats()
+        yield event.plain_result(_format_cache_stats(stats))
+
     async def cmd_similar(event: AstrMessageEvent, args: str) -> AsyncIterator[MessageEventResult]:
         if not args:
             yield event.plain_result(MESSAGES["missing_post_id"])
@@ -142,5 +257,6 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
         "count": cmd_count,
         "status": cmd_status,
         "clearcache": cmd_clear_cache,
+        "cache": cmd_cache,
         "similar": cmd_similar,
     }
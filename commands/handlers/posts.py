@@ -2,13 +2,16 @@
 Post command handlers.
 """
 
-from typing import Dict, AsyncIterator, Iterable, List, Optional
+from typing import Any, Dict, AsyncIterator, Iterable, List, Optional, Tuple
+import asyncio
 import random
 
+from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent, MessageEventResult
 
 from ..context import CommandContext
 from ..types import Handler
+from ...core.image_store import image_key
 
 
 MESSAGES = {
@@ -24,6 +27,10 @@ MESSAGES = {
 
 VALID_RATINGS = ("g", "s", "q", "e")
 VIDEO_EXTS = {"mp4", "webm", "zip", "ugoira"}
+ANIMATED_TAGS = {"animated", "animated_gif", "animated_png"}
+# sample（large_file_url）的宽度与估算大小：Danbooru 生成 850px 宽的 JPEG
+SAMPLE_WIDTH = 850
+SAMPLE_BYTES_PER_PIXEL = 0.3
 
 
 def _is_video_post(post: dict) -> bool:
@@ -47,7 +54,57 @@ def _pick_url(post: dict, keys: Iterable[str], forbid_exts: Optional[set[str]] =
     return None
 
 
-def _select_image_url(ctx: CommandContext, post: dict) -> Optional[str]:
+def _is_animated_post(post: dict) -> bool:
+    if (post.get("file_ext") or "").lower() == "gif":
+        return True
+    tags = (post.get("tag_string_meta") or post.get("tag_string") or "").split()
+    return not ANIMATED_TAGS.isdisjoint(tags)
+
+
+def _sample_dimensions(post: dict, width: int, height: int) -> tuple[int, int]:
+    variants = (post.get("media_asset") or {}).get("variants") or []
+    for variant in variants:
+        if isinstance(variant, dict) and variant.get("type") == "sample":
+            return int(variant.get("width") or 0), int(variant.get("height") or 0)
+    if width <= SAMPLE_WIDTH:
+        return width, height
+    return SAMPLE_WIDTH, height * SAMPLE_WIDTH // width
+
+
+def _variant_cost(post: dict, key: str) -> tuple[int, int]:
+    """估算图片规格的 (字节数, 像素数)；preview 缩略图视为 0"""
+    width = int(post.get("image_width") or 0)
+    height = int(post.get("image_height") or 0)
+    if key == "file_url" or post.get(key) == post.get("file_url"):
+        return int(post.get("file_size") or 0), width * height
+    if key == "large_file_url":
+        sample_width, sample_height = _sample_dimensions(post, width, height)
+        pixels = sample_width * sample_height
+        return int(pixels * SAMPLE_BYTES_PER_PIXEL), pixels
+    return 0, 0
+
+
+def _within_budget(ctx: CommandContext, post: dict, key: str, share: int = 1) -> bool:
+    """预算按整条消息计算：一条消息含 share 张图片时每张使用 1/share"""
+    if not ctx.config:
+        return True
+    share = max(int(share), 1)
+    max_bytes = ctx.config.display.max_image_bytes // share
+    max_pixels = ctx.config.display.max_image_pixels // share
+    # 动图原图通常很大，有单独的 sample 时不发送原图
+    sample_url = post.get("large_file_url")
+    if key == "file_url" and sample_url and sample_url != post.get("file_url") and _is_animated_post(post):
+        return False
+    size, pixels = _variant_cost(post, key)
+    if ctx.config.display.max_image_bytes and size > max_bytes:
+        return False
+    if ctx.config.display.max_image_pixels and pixels > max_pixels:
+        return False
+    return True
+
+
+def _select_image_url(ctx: CommandContext, post: dict, share: int = 1) -> Optional[str]:
+    """选择要发送的图片地址；share 为同一条消息中的图片数，用于平分消息预算"""
     if _is_video_post(post):
         return _pick_url(
             post,
@@ -55,11 +112,23 @@ def _select_image_url(ctx: CommandContext, post: dict) -> Optional[str]:
             forbid_exts=VIDEO_EXTS,
         )
     size = ctx.config.display.preview_size if ctx.config else "preview"
-    if size == "original":
-        return _pick_url(post, ("file_url", "large_file_url", "preview_file_url"))
-    if size == "sample":
-        return _pick_url(post, ("large_file_url", "file_url", "preview_file_url"))
-    return _pick_url(post, ("preview_file_url", "large_file_url", "file_url"))
+    if size in ("auto", "original"):
+        keys = ("file_url", "large_file_url", "preview_file_url")
+    elif size == "sample":
+        keys = ("large_file_url", "file_url", "preview_file_url")
+    else:
+        keys = ("preview_file_url", "large_file_url", "file_url")
+    # preview_size 为上限（auto 即以原图为上限）：按字节/像素预算选择不超限的最大规格，都超限时退回原顺序
+    within = [key for key in keys if _within_budget(ctx, post, key, share)]
+    return _pick_url(post, within) or _pick_url(post, keys)
+
+
+def _append_image(result: MessageEventResult, image: str) -> None:
+    # 本地图片缓存返回文件路径，其余为 CDN 地址
+    if image.startswith(("http://", "https://")):
+        result.url_image(image)
+    else:
+        result.file_image(image)
 
 
 def _build_image_chain(urls: Iterable[str]) -> Optional[MessageEventResult]:
@@ -68,7 +137,7 @@ def _build_image_chain(urls: Iterable[str]) -> Optional[MessageEventResult]:
     for url in urls:
         if not url:
             continue
-        result.url_image(url)
+        _append_image(result, url)
         has_item = True
     return result if has_item else None
 
@@ -77,11 +146,42 @@ def _build_text_image_chain(text: str, url: Optional[str]) -> Optional[MessageEv
     if not url:
         return None
     result = MessageEventResult()
-    result.url_image(url)
+    _append_image(result, url)
     result.message(text)
     return result
 
 
+def _image_headers(ctx: CommandContext) -> Dict[str, str]:
+    headers = {"User-Agent": "AstrBot-Danbooru-Plugin/1.0"}
+    if ctx.config:
+        headers["Referer"] = ctx.config.api.base_url
+    return headers
+
+
+async def _local_image(ctx: CommandContext, post: dict, url: str) -> str:
+    """启用本地图片缓存时返回图片文件路径（未缓存则下载，启用转码时返回转码结果），否则原样返回 URL"""
+    if not ctx.image_store or not ctx.client or not url:
+        return url
+    key = image_key(post, url)
+    if key is None:
+        return url
+    session = await ctx.client._get_session()
+    try:
+        path = await ctx.image_store.fetch(session, url, key, headers=_image_headers(ctx))
+        if path and ctx.transcoder:
+            path = await ctx.transcoder.transcode(key, path)
+    except OSError as exc:
+        # 本地缓存不可用时不影响发送，直接回退到远程地址
+        logger.debug(f"[danbooru] 本地图片缓存失败 {key}: {exc}")
+        return url
+    return path or url
+
+
+async def _local_images(ctx: CommandContext, items: Iterable[Tuple[dict, str]]) -> List[str]:
+    """批量获取本地图片，保持顺序"""
+    return list(await asyncio.gather(*(_local_image(ctx, post, url) for post, url in items)))
+
+
 def _apply_filters(ctx: CommandContext, tags: Optional[str]) -> Optional[str]:
     if not ctx.config:
         return tags
@@ -119,6 +219,23 @@ def _apply_limit(ctx: CommandContext, limit: int) -> int:
             return min(limit, max_results)
 
 
+def _posts_search_limits(ctx: CommandContext, requested: Optional[Any] = None) -> Tuple[int, int]:
+    """posts 命令的展示数量与候选池大小（候选池用于随机挑选与过滤不可访问的图片）"""
+    default_limit = 5
+    requested = int(requested if requested is not None else default_limit)
+    if ctx.config:
+        limit = ctx.config.resolve_batch_limit(requested, default_limit, 20)
+    else:
+        limit = min(requested, 20)
+    limit = _apply_limit(ctx, limit)
+    pool_limit = min(max(limit * 5, limit), 20)
+    if ctx.config and ctx.config.filter.max_results:
+        pool_limit = min(pool_limit, int(ctx.config.filter.max_results))
+    if pool_limit < limit:
+        pool_limit = limit
+    return limit, pool_limit
+
+
 def _shuffle_posts(posts: Iterable[dict]) -> List[dict]:
     items = list(posts or [])
     random.shuffle(items)
@@ -158,20 +275,62 @@ def _format_tags(ctx: CommandContext, tag_string: str) -> str:
 async def _is_image_accessible(ctx: CommandContext, url: str) -> bool:
     if not url or not ctx.client:
         return False
-    headers = {
-        "Range": "bytes=0-0",
-        "User-Agent": "AstrBot-Danbooru-Plugin/1.0",
-    }
-    if ctx.config:
-        headers["Referer"] = ctx.config.api.base_url
+    cached = ctx.reachability.get(url)
+    if cached is not None:
+        return cached
+    headers = {"Range": "bytes=0-0", **_image_headers(ctx)}
     try:
         session = await ctx.client._get_session()
         async with session.get(url, headers=headers) as resp:
-            return resp.status < 400
+            reachable = resp.status < 400
+            ctx.reachability.record(url, reachable, host_failure=resp.status >= 500)
+            return reachable
+    except asyncio.CancelledError:
+        raise
     except Exception:
+        ctx.reachability.record(url, False, host_failure=True)
         return False
 
 
+async def _probe_accessible(
+    ctx: CommandContext,
+    posts: Iterable[dict],
+    limit: int,
+    share: int = 1,
+) -> List[Tuple[dict, str]]:
+    """按候选顺序返回前 limit 个图片可访问的 (帖子, 图片地址)
+
+    检测并发进行（最多 display.probe_concurrency 个），结果仍按候选顺序判定；
+    凑够数量后取消其余检测。share 为这些图片合并发送时一条消息的图片数（见 _select_image_url）。
+    """
+    candidates = [(post, url) for post in posts for url in [_select_image_url(ctx, post, share)] if url]
+    if limit <= 0 or not candidates:
+        return []
+    concurrency = ctx.config.display.probe_concurrency if ctx.config else 6
+    semaphore = asyncio.Semaphore(max(int(concurrency), 1))
+
+    async def probe(url: str) -> bool:
+        async with semaphore:
+            return await _is_image_accessible(ctx, url)
+
+    tasks = [asyncio.ensure_future(probe(url)) for _, url in candidates]
+    selected: List[Tuple[dict, str]] = []
+    try:
+        for candidate, task in zip(candidates, tasks):
+            if await task:
+                selected.append(candidate)
+                if len(selected) >= limit:
+                    break
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        ctx.stats.record_probes(len(tasks) - len(pending), len(selected), len(pending))
+    return selected
+
+
 def _format_search_item(ctx: CommandContext, post: dict, page: int, index: int, total: int) -> str:
     score = post.get("score", 0)
     fav = post.get("fav_count", 0)
@@ -210,7 +369,7 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
         post = response.data
         if _only_image(ctx):
             url = _select_image_url(ctx, post)
-            chain = _build_image_chain([url]) if url else None
+            chain = _build_image_chain([await _local_image(ctx, post, url)]) if url else None
             if chain:
                 yield chain
                 return
@@ -236,7 +395,7 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
         if _show_preview(ctx):
             url = _select_image_url(ctx, post)
             if url and await _is_image_accessible(ctx, url):
-                chain = _build_text_image_chain(info, url)
+                chain = _build_text_image_chain(info, await _local_image(ctx, post, url))
                 if chain:
                     yield chain
                     return
@@ -251,18 +410,7 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
         else:
             tags = _apply_filters(ctx, raw_tags)
         page = int(parsed.flags.get("page", 1))
-        default_limit = 5
-        requested = int(parsed.flags.get("limit", default_limit))
-        if ctx.config:
-            limit = ctx.config.resolve_batch_limit(requested, default_limit, 20)
-        else:
-            limit = min(requested, 20)
-        limit = _apply_limit(ctx, limit)
-        pool_limit = min(max(limit * 5, limit), 20)
-        if ctx.config and ctx.config.filter.max_results:
-            pool_limit = min(pool_limit, int(ctx.config.filter.max_results))
-        if pool_limit < limit:
-            pool_limit = limit
+        limit, pool_limit = _posts_search_limits(ctx, parsed.flags.get("limit"))
 
         response = await ctx.services.posts.list(tags=tags, page=page, limit=pool_limit)
         if not response.success:
@@ -298,15 +446,10 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
                 if not page_posts:
                     break
                 page_posts = _shuffle_posts(page_posts)
-                for post in page_posts:
-                    url = _select_image_url(ctx, post)
-                    if not url:
-                        continue
-                    if not await _is_image_accessible(ctx, url):
-                        continue
-                    selected.append((post, url, page_num))
-                    if len(selected) >= limit:
-                        break
+                accessible = await _probe_accessible(
+                    ctx, page_posts, limit - len(selected), share=limit if only_image else 1
+                )
+                selected.extend((post, url, page_num) for post, url in accessible)
                 if len(selected) >= limit:
                     break
 
@@ -314,17 +457,17 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
                 yield event.plain_result(MESSAGES["posts_not_found"])
                 return
 
+            images = await _local_images(ctx, [(post, url) for post, url, _ in selected[:limit]])
             if only_image:
-                urls = [url for _, url, _ in selected[:limit]]
-                chain = _build_image_chain(urls)
+                chain = _build_image_chain(images)
                 if chain:
                     yield chain
                 return
 
             total = len(selected)
-            for idx, (post, url, page_num) in enumerate(selected[:limit], 1):
+            for idx, ((post, _, page_num), image) in enumerate(zip(selected[:limit], images), 1):
                 text = _format_search_item(ctx, post, page_num, idx, total)
-                chain = _build_text_image_chain(text, url)
+                chain = _build_text_image_chain(text, image)
                 if chain:
                     yield chain
                 else:
@@ -355,7 +498,7 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
         post = response.data
         if _only_image(ctx):
             url = _select_image_url(ctx, post)
-            chain = _build_image_chain([url]) if url else None
+            chain = _build_image_chain([await _local_image(ctx, post, url)]) if url else None
             if chain:
                 yield chain
                 return
@@ -370,7 +513,7 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
         if _show_preview(ctx):
             url = _select_image_url(ctx, post)
             if url and await _is_image_accessible(ctx, url):
-                chain = _build_text_image_chain(info, url)
+                chain = _build_text_image_chain(info, await _local_image(ctx, post, url))
                 if chain:
                     yield chain
                     return
@@ -401,28 +544,20 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
         only_image = _only_image(ctx)
 
         if show_preview or only_image:
-            candidates = _shuffle_posts(posts)
-            selected: List[tuple[dict, str]] = []
-            for post in candidates:
-                url = _select_image_url(ctx, post)
-                if not url:
-                    continue
-                if not await _is_image_accessible(ctx, url):
-                    continue
-                selected.append((post, url))
-                if len(selected) >= limit:
-                    break
+            selected = await _probe_accessible(
+                ctx, _shuffle_posts(posts), limit, share=limit if only_image else 1
+            )
 
             if selected:
+                images = await _local_images(ctx, selected[:limit])
                 if only_image:
-                    urls = [url for _, url in selected[:limit]]
-                    chain = _build_image_chain(urls)
+                    chain = _build_image_chain(images)
                     if chain:
                         yield chain
                     return
 
                 total = len(selected[:limit])
-                for idx, (post, url) in enumerate(selected[:limit], 1):
+                for idx, ((post, _), image) in enumerate(zip(selected[:limit], images), 1):
                     score = post.get("score", 0)
                     fav = post.get("fav_count", 0)
                     rating = post.get("rating", "?")
@@ -437,7 +572,7 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
                         f"🔗 https://danbooru.donmai.us/posts/{post['id']}"
                     )
                     text = "\n".join(lines)
-                    chain = _build_text_image_chain(text, url)
+                    chain = _build_text_image_chain(text, image)
                     if chain:
                         yield chain
                     else:
@@ -6,6 +6,7 @@ from astrbot.api.event import AstrMessageEvent, MessageEventResult
 
 from ..context import CommandContext
 from ..types import Handler
+from ...core.tag_query import canonicalize_tag_query
 import time
 import random
 
@@ -14,8 +15,8 @@ from .posts import (
     _build_image_chain,
     _build_text_image_chain,
     _format_tags,
-    _is_image_accessible,
-    _select_image_url,
+    _local_images,
+    _probe_accessible,
 )
 
 
@@ -92,16 +93,9 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
                 sent_ids: list[int] = []
 
                 if show_preview or only_image:
-                    selected: list[tuple[dict, str]] = []
-                    for post in posts:
-                        url = _select_image_url(ctx, post)
-                        if not url:
-                            continue
-                        if not await _is_image_accessible(ctx, url):
-                            continue
-                        selected.append((post, url))
-                        if len(selected) >= candidate_cap:
-                            break
+                    selected = await _probe_accessible(
+                        ctx, posts, candidate_cap, share=limit if only_image else 1
+                    )
 
                     if selected:
                         post_ids = [post.get("id") for post, _ in selected]
@@ -123,8 +117,9 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
                         random.shuffle(selected)
                         selected = selected[:limit]
                     if selected:
+                        images = await _local_images(ctx, selected)
                         if only_image:
-                            chain = _build_image_chain([url for _, url in selected])
+                            chain = _build_image_chain(images)
                             if chain:
                                 yield chain
                                 sent_ids.extend(
@@ -136,7 +131,7 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
                                 )
                         else:
                             total = len(selected)
-                            for idx, (post, url) in enumerate(selected, 1):
+                            for idx, ((post, _), image) in enumerate(zip(selected, images), 1):
                                 score = post.get("score", 0)
                                 fav = post.get("fav_count", 0)
                                 rating = post.get("rating", "?")
@@ -154,7 +149,7 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
                                     f"🔗 https://danbooru.donmai.us/posts/{post['id']}"
                                 )
                                 text = "\n".join(lines)
-                                chain = _build_text_image_chain(text, url)
+                                chain = _build_text_image_chain(text, image)
                                 if chain:
                                     yield chain
                                     post_id = post.get("id")
@@ -208,7 +203,7 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
             await ctx.services.subscriptions.update_popular_sent(group_id, int(time.time()))
             return
 
-        tag = raw
+        tag = canonicalize_tag_query(raw)
         await ctx.services.subscriptions.subscribe_tag(
             group_id,
             tag,
@@ -263,7 +258,10 @@ def register(ctx: CommandContext) -> Dict[str, Handler]:
             yield event.plain_result(MESSAGES["unsubscribe_popular_ok"])
             return
 
-        ok = await ctx.services.subscriptions.unsubscribe_tag(group_id, raw)
+        # 兼容规范化之前按原样保存的订阅
+        ok = await ctx.services.subscriptions.unsubscribe_tag(group_id, canonicalize_tag_query(raw))
+        if not ok:
+            ok = await ctx.services.subscriptions.unsubscribe_tag(group_id, raw)
         if not ok:
             yield event.plain_result(MESSAGES["unsubscribe_tag_missing"].format(tag=raw))
             return
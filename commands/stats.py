@@ -0,0 +1,67 @@
+"""
+Per-command latency and image probe statistics.
+"""
+
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional
+
+
+# Recent samples kept per command for the average and p95.
+LATENCY_SAMPLES = 200
+
+
+def _percentile(values: Deque[float], ratio: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * ratio), len(ordered) - 1)]
+
+
+def _average(values: Deque[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+@dataclass
+class CommandLatency:
+    count: int = 0
+    first: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+    total: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+
+
+class CommandStats:
+    """Time to first reply and total duration per command, plus probe counters."""
+
+    def __init__(self) -> None:
+        self._latency: Dict[str, CommandLatency] = defaultdict(CommandLatency)
+        self.probes = 0
+        self.accessible = 0
+        self.probes_cancelled = 0
+
+    def record(self, command: str, total: float, first: Optional[float] = None) -> None:
+        item = self._latency[command]
+        item.count += 1
+        item.total.append(total)
+        item.first.append(total if first is None else first)
+
+    def record_probes(self, probed: int, accessible: int, cancelled: int) -> None:
+        self.probes += probed
+        self.accessible += accessible
+        self.probes_cancelled += cancelled
+
+    def snapshot(self) -> Dict[str, Any]:
+        commands = {
+            name: {
+                "count": item.count,
+                "first_avg": _average(item.first),
+                "first_p95": _percentile(item.first, 0.95),
+                "total_avg": _average(item.total),
+            }
+            for name, item in sorted(self._latency.items())
+        }
+        return {
+            "commands": commands,
+            "probes": self.probes,
+            "accessible": self.accessible,
+            "probes_cancelled": self.probes_cancelled,
+        }
@@ -0,0 +1,661 @@
+"""
+Danbooru API Plugin - 响应缓存
+W-TinyLFU 准入 + LRU + TTL 缓存，过期条目按秒分桶惰性清理，按条目数与字节预算双重限制
+"""
+
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import hashlib
+import heapq
+import json
+import time
+import zlib
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+_MASK64 = (1 << 64) - 1
+
+# 认证参数不参与缓存键（auth_method="params" 时由 AuthManager 附加）
+CREDENTIAL_PARAMS = frozenset({"login", "api_key"})
+
+
+def make_cache_key(
+    method: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    identity: str = "",
+) -> str:
+    """生成缓存键：规范编码后取 128 位 BLAKE2b 摘要（32 位十六进制）
+
+    Args:
+        identity: 响应因用户而异时传入用户标识（而非凭证本身），
+            为空表示匿名与已认证请求共用同一条目
+    """
+    parts = [method.upper(), url, identity]
+    if params:
+        parts.extend(
+            f"{name}={value}"
+            for name, value in sorted(params.items())
+            if name not in CREDENTIAL_PARAMS and value is not None
+        )
+    return hashlib.blake2b("\n".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+# 参数名（去掉 search[...] 包装与 _id 后缀）-> 资源类型
+_ID_PARAM_RESOURCES = {
+    "post": "posts",
+    "parent": "posts",
+    "tag": "tags",
+    "artist": "artists",
+    "pool": "pools",
+    "user": "users",
+    "creator": "users",
+    "uploader": "users",
+    "updater": "users",
+    "approver": "users",
+    "wiki_page": "wiki_pages",
+    "topic": "forum_topics",
+    "comment": "comments",
+    "note": "notes",
+}
+
+# 值为标签名的参数：(资源类型或 None 表示任意, 参数名)
+_TAG_PARAMS = (
+    (None, "tags"),
+    ("tags", "search[name]"),
+    ("wiki_pages", "search[title]"),
+    ("artists", "search[name]"),
+    ("related_tag", "query"),
+)
+
+
+def normalize_endpoint(endpoint: str) -> str:
+    """规范化端点路径：去掉首尾斜杠与格式后缀"""
+    path = endpoint.strip("/").split("?", 1)[0]
+    for suffix in (".json", ".xml"):
+        if path.endswith(suffix):
+            return path[: -len(suffix)]
+    return path
+
+
+def endpoint_index_key(endpoint: str) -> str:
+    """精确端点索引键"""
+    return f"endpoint:{normalize_endpoint(endpoint)}"
+
+
+def resource_index_key(resource: str, resource_id: Any = None) -> str:
+    """资源类型索引键；给出 resource_id 时为单个资源的索引键"""
+    if resource_id is None:
+        return f"resource:{resource}"
+    return f"id:{resource}:{resource_id}"
+
+
+def tag_index_key(tag: str) -> str:
+    """标签索引键"""
+    return f"tag:{tag.strip().lower()}"
+
+
+def _split_ids(value: Any) -> List[str]:
+    return [part for part in str(value).replace(" ", ",").split(",") if part.isdigit()]
+
+
+def _split_tags(value: Any) -> List[str]:
+    tags = []
+    for token in str(value).split():
+        token = token.lstrip("-~").lower()
+        # 元标签（order:rank、rating:g 等）与通配符不是具体标签
+        if token and ":" not in token and "*" not in token:
+            tags.append(token)
+    return tags
+
+
+def build_index_keys(endpoint: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, ...]:
+    """为缓存条目生成二级索引键
+
+    - endpoint:<规范化路径>     精确端点
+    - resource:<资源类型>       端点首段
+    - id:<资源类型>:<id>        URL 路径或参数中的资源 ID
+    - tag:<标签名>              tags / search[name] 等参数中的标签
+    """
+    path = normalize_endpoint(endpoint)
+    parts = [part for part in path.split("/") if part]
+    resource = parts[0] if parts else ""
+    keys = {endpoint_index_key(path), resource_index_key(resource)}
+
+    if len(parts) >= 2 and parts[1].isdigit():
+        keys.add(resource_index_key(resource, parts[1]))
+
+    for name, value in (params or {}).items():
+        if value is None:
+            continue
+        field_name = name[7:-1] if name.startswith("search[") and name.endswith("]") else name
+        if field_name == "id":
+            for resource_id in _split_ids(value):
+                keys.add(resource_index_key(resource, resource_id))
+        elif field_name.endswith("_id"):
+            target = _ID_PARAM_RESOURCES.get(field_name[:-3])
+            if target:
+                for resource_id in _split_ids(value):
+                    keys.add(resource_index_key(target, resource_id))
+
+    for scope, name in _TAG_PARAMS:
+        if (scope is None or scope == resource) and params and params.get(name):
+            keys.update(tag_index_key(tag) for tag in _split_tags(params[name]))
+    return tuple(sorted(keys))
+
+
+class NegativeResult:
+    """负缓存标记：上游返回 404 的请求（仅存于内存）"""
+
+    __slots__ = ("message", "response_data")
+
+    def __init__(self, message: str = "", response_data: Optional[Dict[str, Any]] = None):
+        self.message = message
+        self.response_data = response_data
+
+
+class FrequencySketch:
+    """近期访问频率估计（Count-Min Sketch，4 行，计数上限 15）
+
+    - 每行宽度为不小于容量的 2 的幂，内存开销约 4 * 宽度字节。
+    - 累计计数次数达到 10 倍宽度时全部计数减半，使频率反映近期热度而非历史总量。
+    """
+
+    MAX_COUNT = 15
+    _SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5)
+    _HALVE = bytes(i >> 1 for i in range(256))
+
+    def __init__(self, capacity: int):
+        width = 16
+        while width < capacity:
+            width <<= 1
+        self._shift = 64 - (width.bit_length() - 1)
+        self._rows = [bytearray(width) for _ in self._SEEDS]
+        self._sample_size = 10 * width
+        self._additions = 0
+        self.resets = 0
+
+    def _indexes(self, key: str) -> List[int]:
+        h = hash(key) & _MASK64
+        return [((h * seed) & _MASK64) >> self._shift for seed in self._SEEDS]
+
+    def increment(self, key: str) -> None:
+        """记录一次访问"""
+        added = False
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < self.MAX_COUNT:
+                row[index] += 1
+                added = True
+        if added:
+            self._additions += 1
+            if self._additions >= self._sample_size:
+                self._reset()
+
+    def frequency(self, key: str) -> int:
+        """估计访问次数（只会高估）"""
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    def _reset(self) -> None:
+        self._rows = [row.translate(self._HALVE) for row in self._rows]
+        self._additions //= 2
+        self.resets += 1
+
+
+class CompressedValue:
+    """压缩存储的缓存值：紧凑 JSON 序列化后压缩（安装 lz4 时使用 lz4，否则 zlib）"""
+
+    __slots__ = ("payload", "raw_size", "codec")
+
+    def __init__(self, payload: bytes, raw_size: int, codec: str):
+        self.payload = payload
+        self.raw_size = raw_size
+        self.codec = codec
+
+    @classmethod
+    def encode(cls, value: Any) -> Optional["CompressedValue"]:
+        """压缩可 JSON 序列化的值，失败时返回 None"""
+        try:
+            raw = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        except (TypeError, ValueError):
+            return None
+        if lz4_frame is not None:
+            return cls(lz4_frame.compress(raw), len(raw), "lz4")
+        return cls(zlib.compress(raw, 6), len(raw), "zlib")
+
+    def decode(self) -> Any:
+        """解压并反序列化（每次返回新对象）"""
+        if self.codec == "lz4":
+            raw = lz4_frame.decompress(self.payload)
+        else:
+            raw = zlib.decompress(self.payload)
+        return json.loads(raw)
+
+
+class CacheEntry:
+    """缓存条目"""
+
+    __slots__ = (
+        "value", "expires_at", "created_at", "size", "chances", "index_keys",
+        "retain_until", "etag", "last_modified", "family",
+    )
+
+    def __init__(
+        self,
+        value: Any,
+        expires_at: float,
+        created_at: float,
+        size: int = 0,
+        weight: int = 1,
+        index_keys: Tuple[str, ...] = (),
+        retain_until: Optional[float] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        family: str = "",
+    ):
+        self.value = value
+        self.expires_at = expires_at
+        self.created_at = created_at
+        self.size = size
+        self.chances = max(int(weight), 1) - 1  # 淘汰前剩余的“第二次机会”次数
+        self.index_keys = index_keys
+        # 过期后继续保留（用于条件请求重新验证）的截止时间
+        self.retain_until = expires_at if retain_until is None else max(retain_until, expires_at)
+        self.etag = etag
+        self.last_modified = last_modified
+        self.family = family
+
+    def is_expired(self, now: float) -> bool:
+        return now >= self.expires_at
+
+    def is_stale_usable(self, now: float, stale_seconds: float) -> bool:
+        """过期不超过 stale_seconds，可以先返回再后台刷新"""
+        return now < self.expires_at + stale_seconds and not self.is_dead(now)
+
+    def is_dead(self, now: float) -> bool:
+        """超过保留期，可以删除"""
+        return now >= self.retain_until
+
+    @property
+    def has_validators(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+class ResponseCache:
+    """响应缓存
+
+    - get/set 均为 O(1)：OrderedDict 维护 LRU 顺序，命中时移到末尾，满时淘汰队首。
+    - W-TinyLFU 准入：新条目先进入约占容量 1% 的窗口 LRU；被挤出窗口时与主区的淘汰对象
+      比较近期访问频率（FrequencySketch，get 时记录），频率不高于对方则直接丢弃，
+      订阅轮询产生的一次性查询因此无法挤掉常用的搜索与标签条目。已在主区的条目被覆盖时留在主区。
+    - 过期清理按到期秒数分桶，每次写入只处理已到期的桶，均摊 O(1)。
+    - 每个条目在写入时记录近似大小（响应体字节数），增量维护总字节数；
+      设置 max_bytes 后持续淘汰直到低于预算。
+    - 条目可带淘汰权重：位于 LRU 队首时若仍有剩余机会，则消耗一次机会并移到队尾，
+      权重越高的条目（标签、wiki 等）越不容易被搜索结果挤出。
+    - 条目可附带二级索引键（端点、资源 ID、标签），按索引失效的开销与匹配条目数成正比。
+    - 条目过期后可继续保留 retain 秒，get 视为未命中，但 get_stale 仍可取出，
+      用于 stale-while-revalidate 与条件请求；304 时调用 revalidate 续期而无需重新下载。
+    - compress_threshold > 0 时，不小于该字节数的列表/字典响应以压缩后的 JSON 存储
+      （CompressedValue），按压缩后大小计入字节预算，读取时解码；解码耗时与节省的字节数计入统计。
+      条目值须通过 get 或 load 读取。
+    - 键为 make_cache_key 生成的定长摘要，每个请求只计算一次，
+      查找、写入、请求合并与磁盘缓存共用。
+    - 所有操作都不包含 await，单线程事件循环下无需加锁。
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        default_ttl: int = 300,
+        max_bytes: int = 0,
+        admission: bool = True,
+        compress_threshold: int = 0,
+    ):
+        self.max_size = max(int(max_size), 1)
+        self.default_ttl = default_ttl
+        self.max_bytes = max(int(max_bytes or 0), 0)  # 0 表示不限制
+        self._cache: Dict[str, CacheEntry] = {}
+        # LRU 顺序：窗口区与主区（值恒为 None，条目本身在 _cache 中）
+        self._window: "OrderedDict[str, None]" = OrderedDict()
+        self._main: "OrderedDict[str, None]" = OrderedDict()
+        admission = admission and self.max_size > 1
+        self._sketch: Optional[FrequencySketch] = FrequencySketch(self.max_size) if admission else None
+        self.window_size = max(self.max_size // 100, 1) if admission else 0
+        self._rejections = 0
+        self._total_bytes = 0
+        self._expiry_buckets: Dict[int, Set[str]] = {}
+        self._bucket_heap: List[int] = []
+        self._index: Dict[str, Set[str]] = {}
+        self.compress_threshold = max(int(compress_threshold or 0), 0)  # 0 表示不压缩
+        self._compressed_entries = 0
+        self._compressed_saved = 0
+        self._decodes = 0
+        self._decode_seconds = 0.0
+        self._evictions = 0
+        self._family_evictions: Counter = Counter()
+        self._expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @property
+    def total_bytes(self) -> int:
+        """当前缓存占用的近似字节数"""
+        return self._total_bytes
+
+    def _unlink(self, key: str, entry: CacheEntry) -> None:
+        """扣减字节数并移出二级索引"""
+        self._total_bytes -= entry.size
+        if type(entry.value) is CompressedValue:
+            self._compressed_entries -= 1
+            self._compressed_saved -= entry.value.raw_size - len(entry.value.payload)
+        for index_key in entry.index_keys:
+            keys = self._index.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[index_key]
+
+    def _remove(self, key: str) -> Optional[CacheEntry]:
+        """移除条目（到期桶中的残留键在清理时跳过）"""
+        entry = self._cache.pop(key, None)
+        if entry is not None:
+            self._window.pop(key, None)
+            self._main.pop(key, None)
+            self._unlink(key, entry)
+        return entry
+
+    def _touch(self, key: str) -> None:
+        if key in self._window:
+            self._window.move_to_end(key)
+        else:
+            self._main.move_to_end(key)
+
+    def _select_victim(self) -> str:
+        """主区淘汰对象：LRU 队首，仍有剩余机会的条目消耗一次机会后移到队尾"""
+        # 每次跳过都会消耗一次机会，循环必然终止
+        while True:
+            key = next(iter(self._main))
+            entry = self._cache[key]
+            if entry.chances <= 0:
+                return key
+            entry.chances -= 1
+            self._main.move_to_end(key)
+
+    def _peek_victim(self) -> str:
+        """_select_victim 将选中的条目，但不消耗机会、不改变 LRU 顺序
+
+        轮转时剩余机会最少的条目最先被选中，机会相同时取更靠近队首者；遇到没有剩余机会的条目即可停止扫描。
+        """
+        victim, fewest = "", -1
+        for key in self._main:
+            chances = self._cache[key].chances
+            if fewest < 0 or chances < fewest:
+                victim, fewest = key, chances
+                if chances <= 0:
+                    break
+        return victim
+
+    def _evict(self, key: str) -> None:
+        entry = self._remove(key)
+        self._evictions += 1
+        if entry is not None:
+            self._family_evictions[entry.family] += 1
+
+    def _over_bytes(self) -> bool:
+        return bool(self.max_bytes) and self._total_bytes > self.max_bytes
+
+    def _admit(self, key: str) -> None:
+        """窗口挤出的候选进入主区；主区已满时与淘汰对象比较频率，较低者被淘汰（平局淘汰候选）
+
+        比较时只查看淘汰对象，候选被拒绝时不消耗主区条目的机会、不改变 LRU 顺序，
+        也不计入淘汰次数（只计入准入拒绝）。
+        """
+        main_capacity = self.max_size - self.window_size
+        while self._main and (len(self._main) >= main_capacity or self._over_bytes()):
+            if self._sketch.frequency(key) <= self._sketch.frequency(self._peek_victim()):
+                self._remove(key)
+                self._rejections += 1
+                return
+            self._evict(self._select_victim())
+        self._main[key] = None
+
+    def _enforce_budget(self) -> None:
+        while len(self._window) > self.window_size:
+            key = next(iter(self._window))
+            del self._window[key]
+            self._admit(key)
+        while self._cache and (len(self._cache) > self.max_size or self._over_bytes()):
+            self._evict(self._select_victim() if self._main else next(iter(self._window)))
+
+    def _schedule_expiry(self, key: str, expires_at: float) -> None:
+        bucket = int(expires_at)
+        keys = self._expiry_buckets.get(bucket)
+        if keys is None:
+            keys = self._expiry_buckets[bucket] = set()
+            heapq.heappush(self._bucket_heap, bucket)
+        keys.add(key)
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """清理已到期的桶，返回清理的条目数"""
+        if not self._bucket_heap:
+            return 0
+        now = time.monotonic() if now is None else now
+        current = int(now)
+        removed = 0
+        while self._bucket_heap and self._bucket_heap[0] < current:
+            bucket = heapq.heappop(self._bucket_heap)
+            for key in self._expiry_buckets.pop(bucket, ()):
+                entry = self._cache.get(key)
+                # 条目可能已被覆盖为新的过期时间
+                if entry is not None and entry.is_dead(now):
+                    self._remove(key)
+                    removed += 1
+        self._expirations += removed
+        return removed
+
+    async def get(self, key: str) -> Optional[Any]:
+        """获取缓存（key 由 make_cache_key 生成），命中与否都计入访问频率"""
+        if self._sketch is not None:
+            self._sketch.increment(key)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if entry.is_expired(now):
+            if entry.is_dead(now):
+                self._remove(key)
+                self._expirations += 1
+            return None
+        self._touch(key)
+        return self.load(entry)
+
+    def load(self, entry: CacheEntry) -> Any:
+        """取出条目的值，压缩存储的条目在此解码"""
+        value = entry.value
+        if type(value) is not CompressedValue:
+            return value
+        start = time.perf_counter()
+        decoded = value.decode()
+        self._decode_seconds += time.perf_counter() - start
+        self._decodes += 1
+        return decoded
+
+    def get_stale(self, key: str) -> Optional[CacheEntry]:
+        """获取已过期但仍在保留期内的条目（未过期时也返回），用于重新验证"""
+        entry = self._cache.get(key)
+        if entry is None or entry.is_dead(time.monotonic()):
+            return None
+        return entry
+
+    def revalidate(self, key: str, ttl: Optional[int] = None) -> Optional[CacheEntry]:
+        """服务端确认内容未变（304）后续期条目，保留期长度不变"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        retain = entry.retain_until - entry.expires_at
+        entry.expires_at = now + (ttl or self.default_ttl)
+        entry.retain_until = entry.expires_at + retain
+        self._touch(key)
+        self._schedule_expiry(key, entry.retain_until)
+        return entry
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        size: Optional[int] = None,
+        weight: int = 1,
+        index_keys: Iterable[str] = (),
+        retain: float = 0,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        family: str = "",
+    ) -> None:
+        """设置缓存
+
+        Args:
+            size: 响应体字节数；未提供时按序列化结果估算
+            weight: 淘汰权重，见 CachePolicy.weight
+            index_keys: 二级索引键，见 build_index_keys
+            retain: 过期后继续保留的秒数（用于陈旧数据返回与条件请求）
+            etag / last_modified: 响应的校验头，用于条件请求
+            family: 端点族，用于按族统计（get_family_stats）
+        """
+        now = time.monotonic()
+        expires_at = now + (ttl or self.default_ttl)
+        if size is None:
+            entry_size = self._estimate_entry_size(key, value)
+        else:
+            entry_size = len(key) + int(size)
+
+        if (
+            self.compress_threshold
+            and entry_size >= self.compress_threshold
+            and isinstance(value, (list, dict))
+        ):
+            compressed = CompressedValue.encode(value)
+            if compressed is not None and len(compressed.payload) < compressed.raw_size:
+                value = compressed
+                entry_size = len(key) + len(compressed.payload)
+
+        self.purge_expired(now)
+        in_main = key in self._main
+        self._remove(key)
+        if self.max_bytes and entry_size > self.max_bytes:
+            # 单个条目超出预算，不缓存
+            return
+        index_keys = tuple(index_keys)
+        entry = CacheEntry(
+            value, expires_at, now, entry_size, weight, index_keys,
+            retain_until=expires_at + retain,
+            etag=etag,
+            last_modified=last_modified,
+            family=family,
+        )
+        self._cache[key] = entry
+        if in_main or not self.window_size:
+            self._main[key] = None
+        else:
+            self._window[key] = None
+        self._total_bytes += entry_size
+        if type(value) is CompressedValue:
+            self._compressed_entries += 1
+            self._compressed_saved += value.raw_size - len(value.payload)
+        for index_key in index_keys:
+            self._index.setdefault(index_key, set()).add(key)
+        self._schedule_expiry(key, entry.retain_until)
+        self._enforce_budget()
+
+    def _estimate_entry_size(self, key: str, value: Any) -> int:
+        """估算缓存条目占用大小（字节）"""
+        try:
+            payload = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            payload = str(value)
+        return len(key.encode("utf-8")) + len(payload.encode("utf-8"))
+
+    def _reset(self) -> None:
+        self._cache.clear()
+        self._window.clear()
+        self._main.clear()
+        self._compressed_entries = 0
+        self._compressed_saved = 0
+        self._total_bytes = 0
+        self._expiry_buckets.clear()
+        self._bucket_heap.clear()
+        self._index.clear()
+
+    async def clear_with_stats(self) -> Dict[str, int]:
+        """清空缓存并返回统计"""
+        count = len(self._cache)
+        size_bytes = self._total_bytes
+        self._reset()
+        return {"count": count, "size_bytes": size_bytes}
+
+    async def clear(self) -> None:
+        """清空缓存"""
+        self._reset()
+
+    async def invalidate_index(self, *index_keys: str) -> int:
+        """使带有任一索引键的条目失效"""
+        keys: Set[str] = set()
+        for index_key in index_keys:
+            keys.update(self._index.get(index_key, ()))
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    async def invalidate(self, pattern: str = "") -> int:
+        """使索引键（端点、资源 ID、标签）包含 pattern 的缓存失效
+
+        只扫描索引键而非全部条目；精确失效请使用 invalidate_index。
+        """
+        if not pattern:
+            count = len(self._cache)
+            self._reset()
+            return count
+        return await self.invalidate_index(*[k for k in self._index if pattern in k])
+
+    def get_family_stats(self) -> Dict[str, Dict[str, Any]]:
+        """按端点族统计条目数、字节数、淘汰次数与平均条目年龄（秒）；遍历全部条目，仅供查询统计"""
+        now = time.monotonic()
+        result: Dict[str, Dict[str, Any]] = {}
+        ages: Dict[str, float] = {}
+        for entry in self._cache.values():
+            item = result.get(entry.family)
+            if item is None:
+                item = result[entry.family] = {"entries": 0, "bytes": 0, "evictions": 0, "avg_age": 0.0}
+                ages[entry.family] = 0.0
+            item["entries"] += 1
+            item["bytes"] += entry.size
+            ages[entry.family] += now - entry.created_at
+        for family, count in self._family_evictions.items():
+            result.setdefault(family, {"entries": 0, "bytes": 0, "evictions": 0, "avg_age": 0.0})
+            result[family]["evictions"] = count
+        for family, total_age in ages.items():
+            result[family]["avg_age"] = round(total_age / result[family]["entries"], 1)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        return {
+            "entries": len(self._cache),
+            "max_size": self.max_size,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self._evictions,
+            "admission_rejections": self._rejections,
+            "expirations": self._expirations,
+            "index_keys": len(self._index),
+            "compressed_entries": self._compressed_entries,
+            "compressed_bytes_saved": self._compressed_saved,
+            "decodes": self._decodes,
+            "decode_ms_avg": round(self._decode_seconds * 1000 / self._decodes, 3) if self._decodes else 0.0,
+        }
@@ -0,0 +1,170 @@
+"""
+Danbooru API Plugin - 写操作缓存失效
+订阅服务层的变更事件，精确失效受影响资源的缓存与实体，可选后台刷新
+"""
+
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Set, Tuple
+import asyncio
+
+from astrbot.api import logger
+
+from .http_utils import RequestPriority, request_priority
+from ..events.event_bus import Event, EventBus, EventPriority
+from ..events.event_types import (
+    ArtistEvents,
+    CommentEvents,
+    FavoriteEvents,
+    NoteEvents,
+    PoolEvents,
+    PostEvents,
+    TagEvents,
+    UserEvents,
+    WikiEvents,
+)
+
+if TYPE_CHECKING:
+    from .client import DanbooruClient
+
+
+# 事件类型 -> [(资源类型, 事件中的 ID 字段)]
+_RESOURCE_TARGETS = {
+    PostEvents.UPDATED: [("posts", "post_id")],
+    PostEvents.DELETED: [("posts", "post_id")],
+    PostEvents.VOTED: [("posts", "post_id")],
+    PostEvents.FAVORITED: [("posts", "post_id")],
+    PostEvents.UNFAVORITED: [("posts", "post_id")],
+    PostEvents.FLAGGED: [("posts", "post_id")],
+    PostEvents.APPEALED: [("posts", "post_id")],
+    FavoriteEvents.ADDED: [("posts", "post_id"), ("users", "user_id")],
+    FavoriteEvents.REMOVED: [("posts", "post_id"), ("users", "user_id")],
+    PoolEvents.UPDATED: [("pools", "pool_id")],
+    PoolEvents.DELETED: [("pools", "pool_id")],
+    PoolEvents.POST_ADDED: [("pools", "pool_id")],
+    PoolEvents.POST_REMOVED: [("pools", "pool_id")],
+    TagEvents.UPDATED: [("tags", "tag_id")],
+    ArtistEvents.UPDATED: [("artists", "artist_id")],
+    ArtistEvents.BANNED: [("artists", "artist_id")],
+    ArtistEvents.UNBANNED: [("artists", "artist_id")],
+    WikiEvents.UPDATED: [("wiki_pages", "wiki_id")],
+    WikiEvents.DELETED: [("wiki_pages", "wiki_id")],
+    WikiEvents.REVERTED: [("wiki_pages", "wiki_id")],
+    NoteEvents.CREATED: [("notes", "note_id"), ("posts", "post_id")],
+    NoteEvents.UPDATED: [("notes", "note_id"), ("posts", "post_id")],
+    NoteEvents.DELETED: [("notes", "note_id"), ("posts", "post_id")],
+    NoteEvents.REVERTED: [("notes", "note_id"), ("posts", "post_id")],
+    CommentEvents.CREATED: [("comments", "comment_id"), ("posts", "post_id")],
+    CommentEvents.UPDATED: [("comments", "comment_id"), ("posts", "post_id")],
+    CommentEvents.DELETED: [("comments", "comment_id"), ("posts", "post_id")],
+    CommentEvents.VOTED: [("comments", "comment_id")],
+    UserEvents.UPDATED: [("users", "user_id")],
+}
+
+# 新建资源只影响该资源的列表端点
+_CREATED_ENDPOINTS = {
+    PostEvents.CREATED: "posts",
+    PoolEvents.CREATED: "pools",
+    TagEvents.CREATED: "tags",
+    ArtistEvents.CREATED: "artists",
+    WikiEvents.CREATED: "wiki_pages",
+}
+
+# 后台刷新的资源类型（单资源 GET 端点为 "<资源类型>/<id>"）
+_REFRESHABLE = ("posts", "pools", "tags", "artists", "wiki_pages", "users")
+
+
+def _event_value(event: Event, name: str) -> Any:
+    value = getattr(event, name, None)
+    if value is None:
+        value = event.data.get(name)
+    return value
+
+
+class CacheInvalidator:
+    """写操作缓存失效订阅者
+
+    - 服务层写操作成功后会发送 post.updated、favorite.added、pool.post_added 等事件，
+      此处按事件精确失效对应资源（及其关联资源）的缓存与实体。
+    - 帖子更新携带新标签时，同时失效包含这些标签的搜索结果。
+    - refresh=True 时失效后以 bulk 优先级在后台重新获取单资源，下次读取直接命中。
+    """
+
+    def __init__(self, client: "DanbooruClient", refresh: bool = False):
+        self.client = client
+        self.refresh = refresh
+        self._handler_id: Optional[str] = None
+        self._event_bus: Optional[EventBus] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.invalidated = 0
+
+    @property
+    def event_types(self) -> List[str]:
+        return list(_RESOURCE_TARGETS) + list(_CREATED_ENDPOINTS)
+
+    def attach(self, event_bus: EventBus) -> None:
+        """订阅变更事件"""
+        if self._handler_id is not None:
+            return
+        self._event_bus = event_bus
+        self._handler_id = event_bus.subscribe(
+            self.event_types, self.handle, priority=EventPriority.HIGH
+        )
+
+    def detach(self) -> None:
+        """取消订阅并停止后台刷新"""
+        if self._event_bus and self._handler_id:
+            self._event_bus.unsubscribe(self._handler_id)
+        self._handler_id = None
+        self._event_bus = None
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+    def _targets(self, event: Event) -> Iterable[Tuple[str, int]]:
+        for resource, field_name in _RESOURCE_TARGETS.get(event.event_type, ()):
+            value = _event_value(event, field_name)
+            if isinstance(value, int):
+                yield resource, value
+        if event.event_type == PoolEvents.POST_ADDED or event.event_type == PoolEvents.POST_REMOVED:
+            post_id = (_event_value(event, "pool_data") or {}).get("post_id")
+            if isinstance(post_id, int):
+                yield "posts", post_id
+
+    def _tags(self, event: Event) -> List[str]:
+        if event.event_type not in (PostEvents.UPDATED, PostEvents.DELETED):
+            return []
+        post_data = _event_value(event, "post_data") or {}
+        tag_string = post_data.get("tag_string") if isinstance(post_data, dict) else None
+        return tag_string.split() if isinstance(tag_string, str) else []
+
+    async def handle(self, event: Event) -> None:
+        """事件处理器"""
+        count = 0
+        endpoint = _CREATED_ENDPOINTS.get(event.event_type)
+        if endpoint:
+            count += await self.client.invalidate_endpoint(endpoint)
+
+        targets = list(dict.fromkeys(self._targets(event)))
+        for resource, resource_id in targets:
+            count += await self.client.invalidate_resource(resource, resource_id)
+        for tag in self._tags(event):
+            count += await self.client.invalidate_tag(tag)
+
+        self.invalidated += count
+        if self.refresh:
+            for resource, resource_id in targets:
+                if resource in _REFRESHABLE and event.event_type.split(".")[-1] != "deleted":
+                    self._schedule_refresh(f"{resource}/{resource_id}")
+
+    def _schedule_refresh(self, endpoint: str) -> None:
+        task = asyncio.ensure_future(self._refresh(endpoint))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, endpoint: str) -> None:
+        try:
+            with request_priority(RequestPriority.BULK):
+                await self.client.get(endpoint)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.debug(f"[danbooru] 后台刷新 {endpoint} 失败: {exc}")
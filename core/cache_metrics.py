@@ -0,0 +1,55 @@
+"""
+Danbooru API Plugin - 缓存指标
+按端点族统计命中、陈旧返回、负缓存命中与未命中，并按采样率发送 CacheEvent
+"""
+
+from collections import Counter, defaultdict
+from typing import Any, Dict, Optional
+import random
+
+from ..events.event_bus import EventBus
+
+
+# 按端点族累计的计数项
+FAMILY_COUNTERS = ("hits", "stale", "negative", "misses", "sets")
+
+
+class CacheMetrics:
+    """缓存指标
+
+    - 计数只是字典自增，始终开启。
+    - CacheEvent 仅在事件总线上有对应订阅者时才按 sample_rate 采样发送；
+      无人订阅时 should_emit 只做一次字典查询，不构造事件对象。
+    """
+
+    def __init__(self, sample_rate: float = 1.0):
+        self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+        self._counters: Dict[str, Counter] = defaultdict(Counter)
+        self.emitted = 0
+
+    def record(self, family: str, counter: str, amount: int = 1) -> None:
+        """累计一次计数"""
+        self._counters[family][counter] += amount
+
+    def should_emit(self, event_bus: Optional[EventBus], event_type: str, sampled: bool = True) -> bool:
+        """是否发送该类型的缓存事件；sampled=False 时不采样（失效、清空等低频事件）"""
+        if event_bus is None or not event_bus.has_subscribers(event_type):
+            return False
+        if sampled and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        self.emitted += 1
+        return True
+
+    def snapshot(self, storage: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """按端点族汇总计数与存储统计（ResponseCache.get_family_stats）"""
+        storage = storage or {}
+        result: Dict[str, Dict[str, Any]] = {}
+        for family in sorted(set(self._counters) | set(storage)):
+            counters = self._counters.get(family, Counter())
+            item: Dict[str, Any] = {name: counters[name] for name in FAMILY_COUNTERS}
+            served = item["hits"] + item["stale"] + item["negative"]
+            lookups = served + item["misses"]
+            item["hit_ratio"] = served / lookups if lookups else 0.0
+            item.update(storage.get(family, {"entries": 0, "bytes": 0, "evictions": 0, "avg_age": 0.0}))
+            result[family] = item
+        return result
@@ -0,0 +1,145 @@
+"""
+Danbooru API Plugin - 缓存策略
+按端点族（posts / tags / wiki / status ...）决定是否缓存、TTL 与淘汰权重
+"""
+
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+from .config import CacheConfig
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """单个端点族的缓存策略"""
+    family: str
+    cacheable: bool = True
+    ttl: int = 300
+    weight: int = 1  # 淘汰权重：LRU 淘汰时可获得 weight-1 次“第二次机会”
+    stale_seconds: int = 0  # 过期后仍可直接返回并后台刷新的时长（stale-while-revalidate）
+    negative_ttl: int = 0  # 404 与空列表结果的缓存时长，0 表示不缓存
+    shared: bool = True  # 响应与用户无关，匿名与已认证请求共用缓存条目
+
+
+# 默认策略：按资源变化频率设置 TTL 与可接受的陈旧时长
+DEFAULT_POLICIES: Dict[str, CachePolicy] = {
+    # 帖子的可见性与字段取决于用户等级，按用户区分缓存
+    "posts": CachePolicy("posts", ttl=120, stale_seconds=60, shared=False),
+    "post": CachePolicy("post", ttl=300, stale_seconds=600, shared=False),
+    "explore": CachePolicy("explore", ttl=600, weight=2, stale_seconds=1800, shared=False),
+    "counts": CachePolicy("counts", ttl=600, stale_seconds=1800, shared=False),
+    "tags": CachePolicy("tags", ttl=6 * 3600, weight=3, stale_seconds=24 * 3600),
+    "autocomplete": CachePolicy("autocomplete", ttl=3600, weight=2, stale_seconds=24 * 3600),
+    "wiki": CachePolicy("wiki", ttl=6 * 3600, weight=3, stale_seconds=24 * 3600),
+    "artists": CachePolicy("artists", ttl=3600, weight=2, stale_seconds=6 * 3600),
+    "pools": CachePolicy("pools", ttl=900, weight=2, stale_seconds=3600),
+    "users": CachePolicy("users", ttl=600, stale_seconds=3600),
+    "comments": CachePolicy("comments", ttl=120, shared=False),
+    "versions": CachePolicy("versions", ttl=120, shared=False),
+    "iqdb": CachePolicy("iqdb", ttl=3600, stale_seconds=6 * 3600),
+    "status": CachePolicy("status", cacheable=False, ttl=0),
+    "account": CachePolicy("account", cacheable=False, ttl=0),
+}
+
+# 端点首段 -> 端点族
+ENDPOINT_FAMILIES: Dict[str, str] = {
+    "posts": "posts",
+    "explore": "explore",
+    "counts": "counts",
+    "tags": "tags",
+    "tag_aliases": "tags",
+    "tag_implications": "tags",
+    "related_tag": "tags",
+    "autocomplete": "autocomplete",
+    "wiki_pages": "wiki",
+    "artists": "artists",
+    "artist_urls": "artists",
+    "artist_commentaries": "artists",
+    "pools": "pools",
+    "favorite_groups": "pools",
+    "users": "users",
+    "comments": "comments",
+    "notes": "comments",
+    "note_previews": "comments",
+    "forum_topics": "comments",
+    "forum_posts": "comments",
+    "post_versions": "versions",
+    "wiki_page_versions": "versions",
+    "artist_versions": "versions",
+    "pool_versions": "versions",
+    "note_versions": "versions",
+    "artist_commentary_versions": "versions",
+    "iqdb_queries": "iqdb",
+    "status": "status",
+    "rate_limits": "status",
+    "profile": "account",
+    "dmails": "account",
+    "saved_searches": "account",
+    "settings": "account",
+}
+
+
+def resolve_family(endpoint: str) -> str:
+    """根据端点路径解析端点族
+
+    posts/<id> 与 posts 搜索分开处理：单帖详情变化较慢，可缓存更久。
+    """
+    path = endpoint.strip("/").split("?", 1)[0]
+    parts = [part.split(".", 1)[0] for part in path.split("/") if part]
+    if not parts:
+        return "default"
+    family = ENDPOINT_FAMILIES.get(parts[0], "default")
+    if family == "posts" and len(parts) == 2 and parts[1].isdigit():
+        return "post"
+    return family
+
+
+class CachePolicyTable:
+    """缓存策略表
+
+    默认策略之外的端点使用 cache.ttl_seconds（不返回陈旧数据）；
+    cache.stale_while_revalidate 关闭时所有端点族的 stale_seconds 置 0；
+    cache.negative_ttl 统一设置 404 / 空列表的负缓存时长；
+    cache_posts / cache_tags / cache_artists / cache_users 关闭时对应端点族不缓存。
+    """
+
+    def __init__(self, config: Optional[CacheConfig] = None):
+        config = config or CacheConfig()
+        self.default = CachePolicy("default", ttl=config.ttl_seconds, shared=False)
+        self._policies: Dict[str, CachePolicy] = dict(DEFAULT_POLICIES)
+        if not config.stale_while_revalidate:
+            for family, policy in self._policies.items():
+                self._policies[family] = replace(policy, stale_seconds=0)
+        if config.negative_ttl > 0:
+            self.default = replace(self.default, negative_ttl=config.negative_ttl)
+            for family, policy in self._policies.items():
+                if policy.cacheable:
+                    self._policies[family] = replace(policy, negative_ttl=config.negative_ttl)
+
+        toggles = {
+            "posts": config.cache_posts,
+            "post": config.cache_posts,
+            "explore": config.cache_posts,
+            "counts": config.cache_posts,
+            "tags": config.cache_tags,
+            "autocomplete": config.cache_tags,
+            "artists": config.cache_artists,
+            "users": config.cache_users,
+        }
+        for family, enabled in toggles.items():
+            if not enabled:
+                self._policies[family] = replace(self._policies[family], cacheable=False)
+
+    def get(self, family: str) -> CachePolicy:
+        """按端点族获取策略"""
+        return self._policies.get(family, self.default)
+
+    def resolve(self, endpoint: str) -> CachePolicy:
+        """按端点路径获取策略"""
+        return self.get(resolve_family(endpoint))
+
+    def families(self) -> Dict[str, CachePolicy]:
+        """全部策略（含 default）"""
+        policies = dict(self._policies)
+        policies["default"] = self.default
+        return policies
@@ -0,0 +1,234 @@
+"""
+Danbooru API Plugin - 缓存预热
+启动后以 bulk 优先级预取热点端点，并在条目过期前定时刷新；
+交互请求的使用次数持久化到数据目录，作为下次启动的预热列表
+"""
+
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl
+import asyncio
+import json
+import math
+import time
+
+from astrbot.api import logger
+
+from .http_utils import RequestPriority, current_request_priority, request_priority
+from ..events.event_bus import Event, EventBus, EventPriority
+
+if TYPE_CHECKING:
+    from .client import DanbooruClient
+
+
+# (端点, 排序后的参数) —— 可哈希，用于去重与调度
+WarmupTarget = Tuple[str, Tuple[Tuple[str, Any], ...]]
+
+# 额外预热目标的提供者（如订阅标签的首页搜索），每轮调度时重新获取
+TargetProvider = Callable[[], Awaitable[Iterable[Tuple[str, Dict[str, Any]]]]]
+
+# 提前刷新：在 TTL 的该比例处刷新，避免过期后第一次请求未命中
+REFRESH_RATIO = 0.9
+# 两次刷新的最小间隔与失败后的重试间隔（秒）
+MIN_INTERVAL = 60
+RETRY_INTERVAL = 300
+# 调度循环的最长休眠（秒），用于发现新的订阅标签
+MAX_SLEEP = 600
+# 使用计数落盘间隔（秒）
+SAVE_INTERVAL = 300
+# 载入上次运行的计数时衰减一半，使近期使用占主导
+SEED_DECAY = 0.5
+
+
+def make_target(endpoint: str, params: Optional[Dict[str, Any]] = None) -> WarmupTarget:
+    """构造预热目标"""
+    items = tuple(sorted((str(k), v) for k, v in (params or {}).items() if v is not None))
+    return endpoint.strip("/"), items
+
+
+def parse_target(entry: str) -> Optional[WarmupTarget]:
+    """解析配置中的预热项，如 "explore/posts/popular?scale=day" """
+    entry = entry.strip()
+    if not entry:
+        return None
+    endpoint, _, query = entry.partition("?")
+    return make_target(endpoint, dict(parse_qsl(query)))
+
+
+class CacheWarmer:
+    """缓存预热与定时刷新
+
+    - 预热目标 = 配置的端点 + 提供者返回的目标（订阅标签首页）+ 使用次数最多的 top_n 个交互请求。
+    - 启动后依次预取（命中磁盘缓存时不请求上游），之后每个目标在 TTL 的 90% 处以 refresh 模式重新获取，
+      保证交互请求始终命中未过期的条目；策略不缓存的端点（status 等）跳过。
+    - 订阅 api.request 事件统计 interactive 优先级的 GET 请求，定期与关闭时写入 usage_path。
+    """
+
+    def __init__(
+        self,
+        client: "DanbooruClient",
+        endpoints: Iterable[str] = (),
+        top_n: int = 20,
+        usage_path: Optional[str] = None,
+        provider: Optional[TargetProvider] = None,
+    ):
+        self.client = client
+        self.static_targets: List[WarmupTarget] = [
+            target for target in (parse_target(entry) for entry in endpoints) if target
+        ]
+        self.top_n = max(int(top_n), 0)
+        self.usage_path = usage_path
+        self.provider = provider
+        self._usage: Counter = Counter()
+        self._usage_dirty = False
+        self._saved_at = time.monotonic()
+        self._due: Dict[WarmupTarget, float] = {}
+        self._handler_id: Optional[str] = None
+        self._event_bus: Optional[EventBus] = None
+        self._task: Optional[asyncio.Task] = None
+        self.warmed = 0
+        self.failed = 0
+
+    # ==================== 使用统计 ====================
+
+    def attach(self, event_bus: EventBus) -> None:
+        """订阅请求事件以统计交互请求"""
+        if self._handler_id is not None:
+            return
+        self._event_bus = event_bus
+        self._handler_id = event_bus.subscribe("api.request", self._record, priority=EventPriority.MONITOR)
+
+    def detach(self) -> None:
+        """取消订阅"""
+        if self._event_bus and self._handler_id:
+            self._event_bus.unsubscribe(self._handler_id)
+        self._handler_id = None
+        self._event_bus = None
+
+    async def _record(self, event: Event) -> None:
+        if event.data.get("method") != "GET":
+            return
+        if current_request_priority() != RequestPriority.INTERACTIVE:
+            return
+        endpoint = event.data.get("endpoint") or ""
+        if not endpoint or not self.client.cache_policy(endpoint).cacheable:
+            return
+        params = event.data.get("params")
+        try:
+            target = make_target(endpoint, params if isinstance(params, dict) else None)
+            hash(target)
+        except TypeError:
+            return
+        self._usage[target] += 1
+        self._usage_dirty = True
+
+    def load_usage(self) -> int:
+        """载入上次运行保存的使用计数（衰减后），返回条目数"""
+        if not self.usage_path or not Path(self.usage_path).exists():
+            return 0
+        try:
+            data = json.loads(Path(self.usage_path).read_text(encoding="utf-8"))
+            for item in data.get("requests", []):
+                target = make_target(item["endpoint"], item.get("params"))
+                count = math.ceil(int(item.get("count", 0)) * SEED_DECAY)
+                if count > 0:
+                    self._usage[target] += count
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.warning(f"[danbooru] 读取预热列表失败: {exc}")
+        return len(self._usage)
+
+    def save_usage(self) -> None:
+        """保存使用次数最多的请求（保留 top_n 的数倍，便于排名变化）"""
+        if not self.usage_path or not self._usage_dirty:
+            return
+        keep = max(self.top_n * 5, 50)
+        data = {
+            "requests": [
+                {"endpoint": endpoint, "params": dict(params), "count": count}
+                for (endpoint, params), count in self._usage.most_common(keep)
+            ]
+        }
+        try:
+            path = Path(self.usage_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            tmp_path.replace(path)
+            self._usage_dirty = False
+            self._saved_at = time.monotonic()
+        except (OSError, TypeError, ValueError) as exc:
+            logger.warning(f"[danbooru] 保存预热列表失败: {exc}")
+
+    # ==================== 预热调度 ====================
+
+    async def targets(self) -> List[WarmupTarget]:
+        """当前预热目标（去重，保持优先顺序）"""
+        targets = list(self.static_targets)
+        if self.provider is not None:
+            try:
+                targets.extend(make_target(endpoint, params) for endpoint, params in await self.provider())
+            except Exception as exc:
+                logger.debug(f"[danbooru] 获取预热目标失败: {exc}")
+        if self.top_n:
+            targets.extend(target for target, _ in self._usage.most_common(self.top_n))
+        return list(dict.fromkeys(targets))
+
+    def start(self) -> None:
+        """启动预热任务"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """停止预热任务并保存使用计数"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.save_usage()
+
+    async def _warm(self, target: WarmupTarget, refresh: bool) -> float:
+        """预取单个目标，返回下次刷新的间隔秒数（inf 表示不再刷新）"""
+        endpoint, params = target
+        policy = self.client.cache_policy(endpoint)
+        if not policy.cacheable or policy.ttl <= 0:
+            return float("inf")
+        try:
+            with request_priority(RequestPriority.BULK):
+                await self.client.get(endpoint, params=dict(params), refresh=refresh)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.failed += 1
+            logger.debug(f"[danbooru] 预热 {endpoint} 失败: {exc}")
+            return RETRY_INTERVAL
+        self.warmed += 1
+        return max(policy.ttl * REFRESH_RATIO, MIN_INTERVAL)
+
+    async def _run(self) -> None:
+        while True:
+            targets = await self.targets()
+            active = set(targets)
+            for target in list(self._due):
+                if target not in active:
+                    del self._due[target]
+            for target in targets:
+                due = self._due.get(target)
+                if due is not None and due > time.monotonic():
+                    continue
+                # 首次预热允许命中缓存（含磁盘缓存），之后的定时刷新绕过缓存读取
+                interval = await self._warm(target, refresh=due is not None)
+                self._due[target] = time.monotonic() + interval
+            if time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+                self.save_usage()
+            next_due = min(self._due.values(), default=float("inf"))
+            await asyncio.sleep(min(max(next_due - time.monotonic(), 1.0), MAX_SLEEP))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取预热统计"""
+        return {
+            "targets": len(self._due),
+            "warmed": self.warmed,
+            "failed": self.failed,
+            "tracked_requests": len(self._usage),
+        }
@@ -6,27 +6,60 @@ Danbooru API Plugin - HTTP客户端模块
 import asyncio
 import aiohttp
 import json
-from typing import Optional, Dict, Any, TypeVar
+from typing import Optional, Dict, Any, Awaitable, Callable, Tuple, TypeVar
 import time
 from urllib.parse import urlparse
 
 from astrbot.api import logger
 
 from .auth import AuthManager
-from .config import PluginConfig
+from .config import PluginConfig, resolve_data_path
 from .exceptions import (
     DanbooruError,
     AuthenticationError,
     RateLimitError,
+    NotFoundError,
     ValidationError,
     ServerError,
     ServiceUnavailableError,
     raise_for_status,
 )
 from .models import APIResponse, RateLimitInfo
-from .http_utils import RequestOptions, RateLimiter, ResponseCache
+from .cache import (
+    CacheEntry,
+    NegativeResult,
+    ResponseCache,
+    build_index_keys,
+    make_cache_key,
+    endpoint_index_key,
+    normalize_endpoint,
+    resource_index_key,
+    tag_index_key,
+)
+from .cache_metrics import CacheMetrics
+from .cache_policy import CachePolicy, CachePolicyTable
+from .shared_state import SharedRateLimiter, default_shared_path
+from .disk_cache import DiskCache
+from .tag_query import canonicalize_tag_query
+from .entity_store import EntityStore, list_resource, single_resource
+from .http_utils import (
+    RequestOptions,
+    RateLimiter,
+    SingleFlight,
+    PriorityScheduler,
+    RequestPriority,
+    current_request_priority,
+    request_priority,
+    response_header,
+)
 from ..events.event_bus import EventBus
-from ..events.event_types import APIRequestEvent, APIResponseEvent, ErrorEvent
+from ..events.event_types import (
+    APIRequestEvent,
+    APIResponseEvent,
+    CacheEvent,
+    CacheEvents,
+    ErrorEvent,
+)
 
 
 T = TypeVar('T')
@@ -62,13 +95,58 @@ class DanbooruClient:
 
         self._session: Optional[aiohttp.ClientSession] = None
         self._http_proxy: Optional[str] = None
-        self._rate_limiter = RateLimiter(self.config.api.rate_limit_per_second)
+        # 同机多进程共享时，速率额度与磁盘缓存使用同一个 SQLite 文件
+        shared_path: Optional[str] = None
+        self._rate_limiter: RateLimiter
+        if self.config.cache.shared:
+            shared_path = resolve_data_path(self.config.cache.shared_path or default_shared_path())
+            credentials = self.auth.credentials
+            self._rate_limiter = SharedRateLimiter(
+                shared_path,
+                f"{self.config.api.active_url}|{credentials.username if credentials else ''}",
+                self.config.api.rate_limit_per_second,
+            )
+        else:
+            self._rate_limiter = RateLimiter(self.config.api.rate_limit_per_second)
+        self._scheduler = PriorityScheduler(
+            max_concurrency=self.config.api.max_concurrent_requests,
+            reserved_interactive=self.config.api.interactive_reserved_slots,
+        )
         self._cache = ResponseCache(
             max_size=self.config.cache.max_size,
             default_ttl=self.config.cache.ttl_seconds,
+            max_bytes=self.config.cache.max_bytes,
+            admission=self.config.cache.admission_filter,
+            compress_threshold=self.config.cache.compress_threshold,
         )
+        self._cache_policies = CachePolicyTable(self.config.cache)
+        self._disk_cache: Optional[DiskCache] = None
+        if self.config.cache.enabled and shared_path:
+            self._disk_cache = DiskCache(
+                shared_path,
+                max_entries=self.config.cache.persistent_max_entries,
+                max_bytes=self.config.cache.persistent_max_bytes,
+                flush_interval=0.2,
+            )
+        elif self.config.cache.enabled and self.config.cache.persistent:
+            self._disk_cache = DiskCache(
+                resolve_data_path(self.config.cache.persistent_path),
+                max_entries=self.config.cache.persistent_max_entries,
+                max_bytes=self.config.cache.persistent_max_bytes,
+            )
+        self._entities: Optional[EntityStore] = None
+        if self.config.cache.enabled and self.config.cache.entity_cache:
+            self._entities = EntityStore(self.config.cache.entity_max_entries)
+        self._single_flight = SingleFlight()
+        self._metrics = CacheMetrics(self.config.cache.event_sample_rate)
 
         self._request_count = 0
+        self._revalidated_count = 0
+        self._stale_refreshes = 0
+        self._negative_hits = 0
+        self._negative_stored = 0
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        self._revalidated_bytes = 0
         self._last_rate_limit_info: Optional[RateLimitInfo] = None
 
     @property
@@ -87,7 +165,7 @@ class DanbooruClient:
             timeout = aiohttp.ClientTimeout(total=self.config.api.timeout)
             connector = aiohttp.TCPConnector(
                 limit=10,
-                limit_per_host=5,
+                limit_per_host=max(self.config.api.max_concurrent_requests, 1),
                 ttl_dns_cache=300,
                 use_dns_cache=True,
             )
@@ -118,6 +196,14 @@ class DanbooruClient:
 
     async def close(self) -> None:
         """关闭客户端"""
+        refresh_tasks = list(self._refresh_tasks.values())
+        for task in refresh_tasks:
+            task.cancel()
+        if refresh_tasks:
+            await asyncio.gather(*refresh_tasks, return_exceptions=True)
+        if self._disk_cache:
+            await self._disk_cache.close()
+        await self._rate_limiter.close()
         if self._session and not self._session.closed:
             await self._session.close()
             self._session = None
@@ -173,19 +259,29 @@ class DanbooruClient:
         status = response.status
         headers = dict(response.headers)
 
-        # 解析速率限制信息
-        rate_limit_info = RateLimitInfo.from_headers(headers)
+        # 解析速率限制信息（响应头大小写不敏感）
+        rate_limit_info = RateLimitInfo.from_headers(response.headers)
         if rate_limit_info:
             self._last_rate_limit_info = rate_limit_info
+            self._rate_limiter.sync_with_server(
+                burst_pool=rate_limit_info.burst_pool,
+                recharge_rate=rate_limit_info.recharge_rate,
+                # 缺少 limit 字段时 remaining 为默认值 0，不可信
+                remaining=rate_limit_info.remaining if rate_limit_info.limit else None,
+            )
 
-        # 读取响应体
-        try:
-            if response_format == "json":
-                data = await response.json()
-            else:
-                data = await response.text()
-        except (json.JSONDecodeError, aiohttp.ContentTypeError):
-            data = await response.text()
+        # 读取响应体（保留原始字节数用于缓存容量统计）
+        raw = await response.read()
+        text = raw.decode(response.get_encoding() if raw else "utf-8", errors="replace")
+        if response_format == "json" and text.strip():
+            try:
+                data = json.loads(text)
+            except json.JSONDecodeError:
+                data = text
+        elif response_format == "json":
+            data = None
+        else:
+            data = text
 
         # 检查错误状态
         if status >= 400:
@@ -203,6 +299,7 @@ class DanbooruClient:
             status_code=status,
             headers=headers,
             rate_limit=rate_limit_info,
+            size_bytes=len(raw),
         )
 
     async def request(
@@ -214,6 +311,7 @@ class DanbooruClient:
         json_data: Optional[Dict[str, Any]] = None,
         options: Optional[RequestOptions] = None,
         use_cache: bool = True,
+        refresh: bool = False,
     ) -> APIResponse:
         """
         发送API请求
@@ -226,6 +324,7 @@ class DanbooruClient:
             json_data: JSON数据
             options: 请求选项
             use_cache: 是否使用缓存（仅GET请求）
+            refresh: 跳过缓存读取，直接请求上游并写入缓存（预热、定时刷新与读-改-写）
 
         Returns:
             APIResponse对象
@@ -259,8 +358,10 @@ class DanbooruClient:
         # 构建URL
         url = self._build_url(endpoint, response_format)
 
-        # 准备参数
+        # 准备参数（语义相同的标签搜索规范化为同一字符串，共用缓存与请求合并）
         params = dict(raw_params)
+        if method.upper() == "GET" and isinstance(params.get("tags"), str):
+            params["tags"] = canonicalize_tag_query(params["tags"])
         headers = {}
 
         # 应用认证
@@ -269,33 +370,262 @@ class DanbooruClient:
                 headers, params, method=options.auth_method
             )
 
-        # 检查缓存（仅GET请求）
-        if use_cache and method.upper() == "GET" and self.config.cache.enabled:
-            cached = await self._cache.get(method, url, params)
+        # 按端点族解析缓存策略（仅GET请求），缓存键每个请求只计算一次
+        coalesce = use_cache and method.upper() == "GET" and self.config.cache.enabled
+        cache_policy: Optional[CachePolicy] = None
+        cache_key = ""
+        if coalesce:
+            policy = self._cache_policies.resolve(endpoint)
+            cache_key = make_cache_key(method, url, params, self._cache_identity(policy, options))
+            if policy.cacheable:
+                cache_policy = policy
+
+        # 检查缓存
+        if cache_policy is not None and not refresh:
+            cached = await self._cache.get(cache_key)
+            if cached is None and self._disk_cache:
+                cached = await self._promote_from_disk(cache_key, endpoint, params, cache_policy)
+            if isinstance(cached, NegativeResult):
+                self._negative_hits += 1
+                await self._cache_hit(cache_policy, cache_key, "negative")
+                await self._cached_response(method, endpoint, None, start_time, "negative", 404)
+                raise NotFoundError(cached.message or "Resource not found", cached.response_data)
             if cached is not None:
-                duration_ms = (time.time() - start_time) * 1000
-                await self._emit_event(APIResponseEvent(
-                    method=method.upper(),
-                    endpoint=endpoint,
-                    status_code=200,
-                    response_data=self._sanitize_payload(cached),
-                    duration_ms=duration_ms,
-                    from_cache=True,
+                if isinstance(cached, list) and not cached:
+                    self._negative_hits += 1
+                    await self._cache_hit(cache_policy, cache_key, "negative")
+                else:
+                    await self._cache_hit(cache_policy, cache_key, "hits")
+                return await self._cached_response(method, endpoint, cached, start_time, "cache")
+
+            # 单资源查询优先使用列表响应中已获取的实体
+            target = None
+            if self._entities is not None and not raw_params:
+                target = single_resource(endpoint)
+            if target:
+                entity = self._entities.get(*target, max_age=cache_policy.ttl)
+                if entity is not None:
+                    await self._cache_hit(cache_policy, cache_key, "hits")
+                    return await self._cached_response(method, endpoint, entity, start_time, "entity")
+
+        # 已过期的条目：陈旧窗口内先返回并后台刷新；否则带校验头时用条件请求重新验证
+        stale_entry: Optional[CacheEntry] = None
+        if cache_policy is not None and not refresh:
+            stale_entry = self._cache.get_stale(cache_key)
+            if stale_entry is not None and stale_entry.is_stale_usable(
+                time.monotonic(), cache_policy.stale_seconds
+            ):
+                self._schedule_refresh(
+                    cache_key,
+                    lambda: self._send_request(
+                        method, endpoint, url, params, data, json_data, headers,
+                        options, cache_policy, time.time(), event_params,
+                        stale_entry, cache_key,
+                    ),
+                )
+                await self._cache_hit(cache_policy, cache_key, "stale")
+                return await self._cached_response(
+                    method, endpoint, self._cache.load(stale_entry), start_time, "stale"
+                )
+            if stale_entry is not None and not (
+                self.config.cache.revalidate_window > 0 and stale_entry.has_validators
+            ):
+                stale_entry = None
+            self._metrics.record(cache_policy.family, "misses")
+            if self._metrics.should_emit(self.event_bus, CacheEvents.MISS):
+                await self._emit_event(CacheEvent(
+                    cache_key=cache_key, cache_action="miss", family=cache_policy.family,
                 ))
-                if self.config.log_api_calls:
-                    logger.info(
-                        f"[danbooru] {method.upper()} {endpoint} -> 200 "
-                        f"cache hit ({duration_ms:.1f}ms)"
-                    )
-                elif self.config.debug:
-                    logger.debug(
-                        f"[danbooru] {method.upper()} {endpoint} -> 200 "
-                        f"cache hit ({duration_ms:.1f}ms)"
-                    )
-                return APIResponse.success_response(cached)
 
-        # 速率限制
-        await self._rate_limiter.acquire()
+        if coalesce:
+            # 相同请求进行中时合并为一次上游调用
+            return await self._single_flight.run(
+                cache_key,
+                lambda: self._send_request(
+                    method, endpoint, url, params, data, json_data, headers,
+                    options, cache_policy, start_time, event_params,
+                    stale_entry, cache_key,
+                ),
+                options.priority,
+            )
+
+        result = await self._send_request(
+            method, endpoint, url, params, data, json_data, headers,
+            options, cache_policy, start_time, event_params,
+        )
+        if method.upper() != "GET" and result.success:
+            await self._invalidate_written(endpoint)
+        return result
+
+    async def _cache_hit(self, policy: CachePolicy, key: str, counter: str) -> None:
+        """记录缓存命中（hits / stale / negative）并按采样发送 cache.hit 事件"""
+        self._metrics.record(policy.family, counter)
+        if self._metrics.should_emit(self.event_bus, CacheEvents.HIT):
+            await self._emit_event(CacheEvent(cache_key=key, cache_action="hit", family=policy.family))
+
+    async def _cache_stored(self, policy: CachePolicy, key: str, ttl: int) -> None:
+        """记录缓存写入并按采样发送 cache.set 事件"""
+        self._metrics.record(policy.family, "sets")
+        if self._metrics.should_emit(self.event_bus, CacheEvents.SET):
+            await self._emit_event(CacheEvent(
+                cache_key=key, cache_action="set", ttl=ttl, family=policy.family,
+            ))
+
+    def _cache_identity(self, policy: CachePolicy, options: RequestOptions) -> str:
+        """缓存键中的用户标识：共享策略或匿名请求为空，否则使用用户名（不含凭证）"""
+        if policy.shared or not (options.use_auth and self.is_authenticated):
+            return ""
+        credentials = self.auth.credentials
+        return credentials.username if credentials else ""
+
+    def _schedule_refresh(self, key: str, factory: Callable[[], Awaitable[APIResponse]]) -> None:
+        """后台刷新陈旧条目；同一键同时只有一次刷新，前台请求会合并进来"""
+        if key in self._refresh_tasks or self._single_flight.is_running(key):
+            return
+        task = asyncio.ensure_future(self._refresh(key, factory))
+        self._refresh_tasks[key] = task
+        task.add_done_callback(lambda _: self._refresh_tasks.pop(key, None))
+
+    async def _refresh(self, key: str, factory: Callable[[], Awaitable[APIResponse]]) -> None:
+        try:
+            with request_priority(RequestPriority.BACKGROUND):
+                await self._single_flight.run(key, factory)
+            self._stale_refreshes += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.debug(f"[danbooru] 后台刷新缓存失败: {exc}")
+
+    async def _invalidate_written(self, endpoint: str) -> None:
+        """写操作成功后失效被修改资源（"<资源类型>/<id>[/...]"）的缓存"""
+        parts = normalize_endpoint(endpoint).split("/")
+        if len(parts) >= 2 and parts[1].isdigit():
+            await self.invalidate_resource(parts[0], int(parts[1]))
+
+    def _index_keys(self, endpoint: str, params: Dict[str, Any], data: Any) -> Tuple[str, ...]:
+        """缓存条目的索引键；列表响应额外索引其中每个实体的 ID"""
+        index_keys = build_index_keys(endpoint, params)
+        resource = list_resource(endpoint, params) if isinstance(data, list) else None
+        if resource:
+            index_keys += tuple(
+                resource_index_key(resource, item["id"])
+                for item in data
+                if isinstance(item, dict) and isinstance(item.get("id"), int)
+            )
+        return index_keys
+
+    async def _cached_response(
+        self,
+        method: str,
+        endpoint: str,
+        data: Any,
+        start_time: float,
+        source: str,
+        status_code: int = 200,
+    ) -> APIResponse:
+        """返回缓存命中结果并发送响应事件"""
+        duration_ms = (time.time() - start_time) * 1000
+        await self._emit_event(APIResponseEvent(
+            method=method.upper(),
+            endpoint=endpoint,
+            status_code=status_code,
+            response_data=self._sanitize_payload(data),
+            duration_ms=duration_ms,
+            from_cache=True,
+        ))
+        if self.config.log_api_calls:
+            logger.info(
+                f"[danbooru] {method.upper()} {endpoint} -> {status_code} "
+                f"{source} hit ({duration_ms:.1f}ms)"
+            )
+        elif self.config.debug:
+            logger.debug(
+                f"[danbooru] {method.upper()} {endpoint} -> {status_code} "
+                f"{source} hit ({duration_ms:.1f}ms)"
+            )
+        return APIResponse.success_response(data)
+
+    def _store_entities(self, endpoint: str, params: Dict[str, Any], data: Any) -> None:
+        """将列表或单资源响应写入实体缓存"""
+        if isinstance(data, list):
+            resource = list_resource(endpoint, params)
+            if resource:
+                self._entities.put_many(resource, data)
+        elif isinstance(data, dict) and not params.get("only"):
+            target = single_resource(endpoint)
+            if target:
+                self._entities.put(target[0], data)
+
+    async def _promote_from_disk(
+        self,
+        key: str,
+        endpoint: str,
+        params: Dict[str, Any],
+        policy: CachePolicy,
+    ) -> Optional[Any]:
+        """从磁盘二级缓存读取，命中时回填内存缓存"""
+        hit = await self._disk_cache.get(key)
+        if hit is None:
+            return None
+        value, ttl, size = hit
+        await self._cache.set(
+            key, value,
+            ttl=ttl,
+            size=size,
+            weight=policy.weight,
+            index_keys=self._index_keys(endpoint, params, value),
+            family=policy.family,
+        )
+        return value
+
+    def _use_revalidated(
+        self,
+        key: str,
+        result: APIResponse,
+        stale_entry: CacheEntry,
+        cache_policy: CachePolicy,
+    ) -> APIResponse:
+        """304：续期缓存条目并返回其内容"""
+        self._cache.revalidate(key, ttl=cache_policy.ttl)
+        self._revalidated_count += 1
+        self._revalidated_bytes += stale_entry.size
+        return APIResponse(
+            success=True,
+            data=self._cache.load(stale_entry),
+            status_code=200,
+            headers=result.headers,
+            rate_limit=result.rate_limit,
+        )
+
+    async def _send_request(
+        self,
+        method: str,
+        endpoint: str,
+        url: str,
+        params: Dict[str, Any],
+        data: Optional[Dict[str, Any]],
+        json_data: Optional[Dict[str, Any]],
+        headers: Dict[str, str],
+        options: RequestOptions,
+        cache_policy: Optional[CachePolicy],
+        start_time: float,
+        event_params: Any,
+        stale_entry: Optional[CacheEntry] = None,
+        cache_key: str = "",
+    ) -> APIResponse:
+        """发送请求到上游（含优先级调度、速率限制与重试）
+
+        cache_policy 为 None 时不写入缓存（否则 cache_key 必须给出）；给出 stale_entry 时发送条件请求，
+        服务端返回 304 则续期该条目并直接使用其内容。
+        """
+        response_format = options.response_format
+        priority = options.priority or current_request_priority()
+        if stale_entry is not None:
+            headers = dict(headers)
+            if stale_entry.etag:
+                headers["If-None-Match"] = stale_entry.etag
+            if stale_entry.last_modified:
+                headers["If-Modified-Since"] = stale_entry.last_modified
 
         # 重试逻辑
         max_retries = options.retries or self.config.api.max_retries
@@ -303,58 +633,117 @@ class DanbooruClient:
 
         for attempt in range(max_retries + 1):
             try:
-                session = await self._get_session()
+                async with self._scheduler.slot(priority):
+                    # 速率限制（每次尝试都消耗令牌）
+                    await self._rate_limiter.acquire(priority)
 
-                # 发送请求
-                async with session.request(
-                    method=method.upper(),
-                    url=url,
-                    params=params,
-                    data=data,
-                    json=json_data,
-                    headers=headers,
-                    proxy=self._http_proxy,
-                ) as response:
-                    self._request_count += 1
-                    result = await self._handle_response(response, response_format)
-
-                    # 缓存结果
-                    if (
-                        use_cache
-                        and method.upper() == "GET"
-                        and self.config.cache.enabled
-                        and result.success
-                    ):
-                        await self._cache.set(method, url, result.data, params)
-
-                    duration_ms = (time.time() - start_time) * 1000
-                    await self._emit_event(APIResponseEvent(
+                    session = await self._get_session()
+
+                    # 发送请求
+                    async with session.request(
                         method=method.upper(),
-                        endpoint=endpoint,
-                        status_code=result.status_code,
-                        response_data=self._sanitize_payload(result.data),
-                        duration_ms=duration_ms,
-                        from_cache=False,
-                    ))
-                    if self.config.log_api_calls:
-                        logger.info(
-                            f"[danbooru] {method.upper()} {endpoint} -> {result.status_code} "
-                            f"({duration_ms:.1f}ms)"
+                        url=url,
+                        params=params,
+                        data=data,
+                        json=json_data,
+                        headers=headers,
+                        proxy=self._http_proxy,
+                    ) as response:
+                        self._request_count += 1
+                        result = await self._handle_response(response, response_format)
+
+                # 缓存结果
+                if result.status_code == 304 and stale_entry is not None:
+                    result = self._use_revalidated(cache_key, result, stale_entry, cache_policy)
+                    if self._disk_cache:
+                        self._disk_cache.put(
+                            cache_key,
+                            result.data,
+                            ttl=cache_policy.ttl,
+                            size=stale_entry.size,
+                            index_keys=stale_entry.index_keys,
                         )
-                    elif self.config.debug:
-                        logger.debug(
-                            f"[danbooru] {method.upper()} {endpoint} -> {result.status_code} "
-                            f"({duration_ms:.1f}ms)"
+                elif cache_policy is not None and result.success:
+                    index_keys = self._index_keys(endpoint, params, result.data)
+                    etag = response_header(result.headers, "ETag")
+                    last_modified = response_header(result.headers, "Last-Modified")
+                    ttl = cache_policy.ttl
+                    retain = cache_policy.stale_seconds
+                    if etag or last_modified:
+                        retain = max(retain, self.config.cache.revalidate_window)
+                    negative = isinstance(result.data, list) and not result.data
+                    if negative:
+                        # 空列表按负缓存时长处理，且不作为陈旧数据返回
+                        ttl = min(ttl, cache_policy.negative_ttl)
+                        retain = 0
+                    if ttl > 0:
+                        if negative:
+                            self._negative_stored += 1
+                        await self._cache.set(
+                            cache_key, result.data,
+                            ttl=ttl,
+                            size=result.size_bytes,
+                            weight=cache_policy.weight,
+                            index_keys=index_keys,
+                            retain=retain,
+                            etag=etag,
+                            last_modified=last_modified,
+                            family=cache_policy.family,
                         )
+                        await self._cache_stored(cache_policy, cache_key, ttl)
+                        if self._disk_cache:
+                            self._disk_cache.put(
+                                cache_key,
+                                result.data,
+                                ttl=ttl,
+                                size=result.size_bytes,
+                                index_keys=index_keys,
+                            )
+                    if self._entities is not None:
+                        self._store_entities(endpoint, params, result.data)
 
-                    return result
+                duration_ms = (time.time() - start_time) * 1000
+                await self._emit_event(APIResponseEvent(
+                    method=method.upper(),
+                    endpoint=endpoint,
+                    status_code=result.status_code,
+                    response_data=self._sanitize_payload(result.data),
+                    duration_ms=duration_ms,
+                    from_cache=False,
+                ))
+                if self.config.log_api_calls:
+                    logger.info(
+                        f"[danbooru] {method.upper()} {endpoint} -> {result.status_code} "
+                        f"({duration_ms:.1f}ms, {priority})"
+                    )
+                elif self.config.debug:
+                    logger.debug(
+                        f"[danbooru] {method.upper()} {endpoint} -> {result.status_code} "
+                        f"({duration_ms:.1f}ms, {priority})"
+                    )
+
+                return result
+
+            except NotFoundError as e:
+                if cache_policy is not None and cache_policy.negative_ttl > 0:
+                    await self._cache.set(
+                        cache_key, NegativeResult(e.message, e.response_data),
+                        ttl=cache_policy.negative_ttl,
+                        size=0,
+                        index_keys=build_index_keys(endpoint, params),
+                        family=cache_policy.family,
+                    )
+                    self._negative_stored += 1
+                    await self._cache_stored(cache_policy, cache_key, cache_policy.negative_ttl)
+                raise
 
             except RateLimitError as e:
                 last_error = e
+                # 清空令牌桶，下一次 acquire 会等待到可用
                 if e.retry_after:
-                    await asyncio.sleep(e.retry_after)
+                    self._rate_limiter.penalize(e.retry_after)
                 else:
-                    await asyncio.sleep(self.config.api.retry_delay * (2 ** attempt))
+                    self._rate_limiter.penalize(self.config.api.retry_delay * (2 ** attempt))
 
             except (ServiceUnavailableError, ServerError) as e:
                 last_error = e
@@ -456,17 +845,89 @@ class DanbooruClient:
 
     # ==================== 缓存管理 ====================
 
+    async def _cache_cleared(self) -> None:
+        if self._metrics.should_emit(self.event_bus, CacheEvents.CLEAR, sampled=False):
+            await self._emit_event(CacheEvent(cache_action="clear"))
+
     async def clear_cache(self) -> None:
-        """清空缓存"""
+        """清空缓存（内存与磁盘）"""
         await self._cache.clear()
+        await self._cache_cleared()
+        if self._entities is not None:
+            self._entities.clear()
+        if self._disk_cache:
+            await self._disk_cache.clear()
 
     async def clear_cache_with_stats(self) -> Dict[str, int]:
         """清空缓存并返回统计"""
-        return await self._cache.clear_with_stats()
+        stats = await self._cache.clear_with_stats()
+        await self._cache_cleared()
+        if self._entities is not None:
+            stats["entity_count"] = self._entities.clear()
+        if self._disk_cache:
+            disk_stats = await self._disk_cache.get_stats()
+            await self._disk_cache.clear()
+            stats["disk_count"] = disk_stats.get("entries", 0)
+            stats["disk_size_bytes"] = disk_stats.get("bytes", 0)
+        return stats
 
     async def invalidate_cache(self, pattern: str = "") -> int:
-        """使缓存失效"""
-        return await self._cache.invalidate(pattern)
+        """使缓存失效（内存与磁盘）"""
+        count = await self._cache.invalidate(pattern)
+        if self._entities is not None:
+            self._entities.invalidate(pattern)
+        if self._disk_cache:
+            count += await self._disk_cache.invalidate(pattern)
+        await self._cache_invalidated(pattern)
+        return count
+
+    async def _invalidate_index(self, *index_keys: str) -> int:
+        count = await self._cache.invalidate_index(*index_keys)
+        if self._disk_cache:
+            count += await self._disk_cache.invalidate_index(*index_keys)
+        await self._cache_invalidated(",".join(index_keys))
+        return count
+
+    async def _cache_invalidated(self, cache_key: str) -> None:
+        if self._metrics.should_emit(self.event_bus, CacheEvents.INVALIDATE, sampled=False):
+            await self._emit_event(CacheEvent(cache_key=cache_key, cache_action="invalidate"))
+
+    async def invalidate_endpoint(self, endpoint: str) -> int:
+        """使指定端点（精确匹配，如 "posts" 不含 "posts/123"）的缓存失效"""
+        return await self._invalidate_index(endpoint_index_key(endpoint))
+
+    async def invalidate_resource(self, resource: str, resource_id: Optional[int] = None) -> int:
+        """使指定资源的缓存失效
+
+        给出 resource_id 时只使该资源（路径或参数中包含该 ID 的请求）失效，
+        否则使该资源类型下全部端点失效（"posts" 不会波及 "post_versions"）。
+        """
+        if self._entities is not None:
+            if resource_id is None:
+                self._entities.invalidate(f"{resource}/")
+            else:
+                self._entities.discard(resource, resource_id)
+        return await self._invalidate_index(resource_index_key(resource, resource_id))
+
+    async def invalidate_tag(self, tag: str) -> int:
+        """使搜索条件或名称中包含指定标签的缓存失效"""
+        return await self._invalidate_index(tag_index_key(tag))
+
+    def cache_policy(self, endpoint: str) -> CachePolicy:
+        """端点对应的缓存策略"""
+        return self._cache_policies.resolve(endpoint)
+
+    async def get_cache_stats(self) -> Dict[str, Any]:
+        """获取缓存统计（含磁盘二级缓存）"""
+        stats: Dict[str, Any] = {
+            "memory": self._cache.get_stats(),
+            "families": self._metrics.snapshot(self._cache.get_family_stats()),
+        }
+        if self._entities is not None:
+            stats["entities"] = self._entities.get_stats()
+        if self._disk_cache:
+            stats["disk"] = await self._disk_cache.get_stats()
+        return stats
 
     # ==================== 状态信息 ====================
 
@@ -474,9 +935,17 @@ class DanbooruClient:
         """获取客户端统计信息"""
         return {
             "request_count": self._request_count,
+            "coalesced_count": self._single_flight.coalesced,
+            "stale_refreshes": self._stale_refreshes,
+            "negative_cache": {"hits": self._negative_hits, "stored": self._negative_stored},
+            "revalidated_count": self._revalidated_count,
+            "revalidated_bytes_saved": self._revalidated_bytes,
             "is_authenticated": self.is_authenticated,
             "base_url": self.base_url,
             "rate_limit": self._last_rate_limit_info.__dict__ if self._last_rate_limit_info else None,
+            "rate_limiter": self._rate_limiter.get_stats(),
+            "scheduler": self._scheduler.get_stats(),
+            "cache": self._cache.get_stats(),
         }
 
     async def health_check(self) -> bool:
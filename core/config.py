@@ -28,6 +28,8 @@ class APIConfig:
     max_retries: int = 3
     retry_delay: float = 1.0
     rate_limit_per_second: int = 10  # 全局速率限制
+    max_concurrent_requests: int = 5  # 上游最大并发请求数
+    interactive_reserved_slots: int = 1  # 为交互命令保留的并发槽位
     
     @property
     def active_url(self) -> str:
@@ -79,6 +81,36 @@ class CacheConfig:
     enabled: bool = True
     ttl_seconds: int = 300  # 5分钟
     max_size: int = 1000
+    max_bytes: int = 32 * 1024 * 1024  # 近似字节预算，0 表示不限制
+    admission_filter: bool = True  # W-TinyLFU 准入：低频新条目不能挤掉高频条目
+    compress_threshold: int = 0  # 不小于该字节数的响应压缩存储，0 关闭
+    persistent: bool = False  # 启用 SQLite 二级缓存
+    persistent_path: str = "cache/responses.sqlite3"  # 相对插件数据目录
+    persistent_max_entries: int = 20000
+    persistent_max_bytes: int = 256 * 1024 * 1024
+    shared: bool = False  # 同机多进程共享磁盘缓存与上游速率额度
+    shared_path: str = ""  # 共享数据库路径，为空时使用数据目录下的 cache/shared.sqlite3
+    entity_cache: bool = True  # 从列表响应填充实体缓存，单资源查询优先命中
+    entity_max_entries: int = 5000
+    refresh_on_write: bool = False  # 写操作失效缓存后在后台重新获取该资源
+    stale_while_revalidate: bool = True  # 过期不久的条目先返回，后台刷新
+    negative_ttl: int = 300  # 404 与空列表的缓存秒数，0 关闭
+    revalidate_window: int = 3600  # 带 ETag/Last-Modified 的条目过期后保留秒数，用于条件请求；0 关闭
+    event_sample_rate: float = 0.1  # cache.hit/miss/set 事件采样率（仅在有订阅者时发送）
+    image_probe_ttl: int = 600  # 图片地址可访问结果的缓存秒数，0 关闭
+    image_probe_negative_ttl: int = 60  # 图片地址不可访问结果的缓存秒数，0 关闭
+    image_host_cooldown: int = 120  # 图片主机连续失败后跳过的秒数，0 关闭
+    image_store: bool = False  # 图片下载到本地后以文件发送，多群推送只从 CDN 下载一次
+    image_store_path: str = "cache/images"  # 相对插件数据目录
+    image_store_max_bytes: int = 512 * 1024 * 1024
+    warmup: bool = False  # 启动时预热热点端点，并在过期前定时刷新
+    warmup_endpoints: List[str] = field(default_factory=lambda: [
+        "explore/posts/popular?scale=day",
+        "explore/posts/popular?scale=week",
+        "explore/posts/popular?scale=month",
+    ])
+    warmup_top_n: int = 20  # 额外预热上次运行中使用最多的交互请求数
+    warmup_subscriptions: bool = True  # 预热订阅标签的首页搜索
     cache_posts: bool = True
     cache_tags: bool = True
     cache_artists: bool = True
@@ -123,13 +155,21 @@ class DisplayConfig:
     show_preview: bool = True
     search_limit: int = 1
     only_image: bool = False
-    preview_size: str = "preview"  # preview, sample, original
+    preview_size: str = "auto"  # auto（预算内最大规格）, preview, sample, original
     show_tags: bool = True
     max_tags_display: int = 0
     show_source: bool = True
     show_artist: bool = True
     show_score: bool = True
     language: str = "zh-CN"
+    max_image_bytes: int = 5 * 1024 * 1024  # 每条消息的图片字节预算（多图消息按图片数平分），超出时改用更小的规格，0 不限制
+    max_image_pixels: int = 4096 * 4096  # 每条消息的图片像素预算（多图消息按图片数平分），0 不限制
+    probe_concurrency: int = 6  # 并发检测图片可访问性的最大请求数
+    transcode: bool = False  # 发送前缩放并重新编码大图（需 Pillow，自动启用本地图片缓存）
+    transcode_max_edge: int = 2048
+    transcode_format: str = "jpeg"  # jpeg, webp
+    transcode_quality: int = 85
+    transcode_workers: int = 2  # 转码进程数
 
 
 @dataclass
@@ -175,6 +215,12 @@ class PluginConfig:
                 max_retries=api_data.get("max_retries", config.api.max_retries),
                 retry_delay=api_data.get("retry_delay", config.api.retry_delay),
                 rate_limit_per_second=api_data.get("rate_limit_per_second", config.api.rate_limit_per_second),
+                max_concurrent_requests=api_data.get(
+                    "max_concurrent_requests", config.api.max_concurrent_requests
+                ),
+                interactive_reserved_slots=api_data.get(
+                    "interactive_reserved_slots", config.api.interactive_reserved_slots
+                ),
             )
         
         if "auth" in data:
@@ -201,6 +247,46 @@ class PluginConfig:
                 enabled=cache_data.get("enabled", config.cache.enabled),
                 ttl_seconds=cache_data.get("ttl_seconds", config.cache.ttl_seconds),
                 max_size=cache_data.get("max_size", config.cache.max_size),
+                max_bytes=cache_data.get("max_bytes", config.cache.max_bytes),
+                admission_filter=cache_data.get("admission_filter", config.cache.admission_filter),
+                compress_threshold=cache_data.get("compress_threshold", config.cache.compress_threshold),
+                persistent=cache_data.get("persistent", config.cache.persistent),
+                persistent_path=cache_data.get("persistent_path", config.cache.persistent_path),
+                persistent_max_entries=cache_data.get(
+                    "persistent_max_entries", config.cache.persistent_max_entries
+                ),
+                persistent_max_bytes=cache_data.get(
+                    "persistent_max_bytes", config.cache.persistent_max_bytes
+                ),
+                shared=cache_data.get("shared", config.cache.shared),
+                shared_path=cache_data.get("shared_path", config.cache.shared_path),
+                entity_cache=cache_data.get("entity_cache", config.cache.entity_cache),
+                entity_max_entries=cache_data.get(
+                    "entity_max_entries", config.cache.entity_max_entries
+                ),
+                refresh_on_write=cache_data.get("refresh_on_write", config.cache.refresh_on_write),
+                stale_while_revalidate=cache_data.get(
+                    "stale_while_revalidate", config.cache.stale_while_revalidate
+                ),
+                negative_ttl=cache_data.get("negative_ttl", config.cache.negative_ttl),
+                revalidate_window=cache_data.get("revalidate_window", config.cache.revalidate_window),
+                event_sample_rate=cache_data.get("event_sample_rate", config.cache.event_sample_rate),
+                image_probe_ttl=cache_data.get("image_probe_ttl", config.cache.image_probe_ttl),
+                image_probe_negative_ttl=cache_data.get(
+                    "image_probe_negative_ttl", config.cache.image_probe_negative_ttl
+                ),
+                image_host_cooldown=cache_data.get("image_host_cooldown", config.cache.image_host_cooldown),
+                image_store=cache_data.get("image_store", config.cache.image_store),
+                image_store_path=cache_data.get("image_store_path", config.cache.image_store_path),
+                image_store_max_bytes=cache_data.get(
+                    "image_store_max_bytes", config.cache.image_store_max_bytes
+                ),
+                warmup=cache_data.get("warmup", config.cache.warmup),
+                warmup_endpoints=cache_data.get("warmup_endpoints", config.cache.warmup_endpoints),
+                warmup_top_n=cache_data.get("warmup_top_n", config.cache.warmup_top_n),
+                warmup_subscriptions=cache_data.get(
+                    "warmup_subscriptions", config.cache.warmup_subscriptions
+                ),
                 cache_posts=cache_data.get("cache_posts", config.cache.cache_posts),
                 cache_tags=cache_data.get("cache_tags", config.cache.cache_tags),
                 cache_artists=cache_data.get("cache_artists", config.cache.cache_artists),
@@ -232,6 +318,14 @@ class PluginConfig:
                 show_artist=display_data.get("show_artist", config.display.show_artist),
                 show_score=display_data.get("show_score", config.display.show_score),
                 language=display_data.get("language", config.display.language),
+                max_image_bytes=display_data.get("max_image_bytes", config.display.max_image_bytes),
+                max_image_pixels=display_data.get("max_image_pixels", config.display.max_image_pixels),
+                probe_concurrency=display_data.get("probe_concurrency", config.display.probe_concurrency),
+                transcode=display_data.get("transcode", config.display.transcode),
+                transcode_max_edge=display_data.get("transcode_max_edge", config.display.transcode_max_edge),
+                transcode_format=display_data.get("transcode_format", config.display.transcode_format),
+                transcode_quality=display_data.get("transcode_quality", config.display.transcode_quality),
+                transcode_workers=display_data.get("transcode_workers", config.display.transcode_workers),
             )
 
         if "subscriptions" in data:
@@ -270,6 +364,8 @@ class PluginConfig:
                 "max_retries": self.api.max_retries,
                 "retry_delay": self.api.retry_delay,
                 "rate_limit_per_second": self.api.rate_limit_per_second,
+                "max_concurrent_requests": self.api.max_concurrent_requests,
+                "interactive_reserved_slots": self.api.interactive_reserved_slots,
             },
             "auth": {
                 "username": self.auth.username,
@@ -287,6 +383,32 @@ class PluginConfig:
                 "enabled": self.cache.enabled,
                 "ttl_seconds": self.cache.ttl_seconds,
                 "max_size": self.cache.max_size,
+                "max_bytes": self.cache.max_bytes,
+                "admission_filter": self.cache.admission_filter,
+                "compress_threshold": self.cache.compress_threshold,
+                "persistent": self.cache.persistent,
+                "persistent_path": self.cache.persistent_path,
+                "persistent_max_entries": self.cache.persistent_max_entries,
+                "persistent_max_bytes": self.cache.persistent_max_bytes,
+                "shared": self.cache.shared,
+                "shared_path": self.cache.shared_path,
+                "entity_cache": self.cache.entity_cache,
+                "entity_max_entries": self.cache.entity_max_entries,
+                "refresh_on_write": self.cache.refresh_on_write,
+                "stale_while_revalidate": self.cache.stale_while_revalidate,
+                "negative_ttl": self.cache.negative_ttl,
+                "revalidate_window": self.cache.revalidate_window,
+                "event_sample_rate": self.cache.event_sample_rate,
+                "image_probe_ttl": self.cache.image_probe_ttl,
+                "image_probe_negative_ttl": self.cache.image_probe_negative_ttl,
+                "image_host_cooldown": self.cache.image_host_cooldown,
+                "image_store": self.cache.image_store,
+                "image_store_path": self.cache.image_store_path,
+                "image_store_max_bytes": self.cache.image_store_max_bytes,
+                "warmup": self.cache.warmup,
+                "warmup_endpoints": self.cache.warmup_endpoints,
+                "warmup_top_n": self.cache.warmup_top_n,
+                "warmup_subscriptions": self.cache.warmup_subscriptions,
                 "cache_posts": self.cache.cache_posts,
                 "cache_tags": self.cache.cache_tags,
                 "cache_artists": self.cache.cache_artists,
@@ -315,6 +437,14 @@ class PluginConfig:
                 "show_artist": self.display.show_artist,
                 "show_score": self.display.show_score,
                 "language": self.display.language,
+                "max_image_bytes": self.display.max_image_bytes,
+                "max_image_pixels": self.display.max_image_pixels,
+                "probe_concurrency": self.display.probe_concurrency,
+                "transcode": self.display.transcode,
+                "transcode_max_edge": self.display.transcode_max_edge,
+                "transcode_format": self.display.transcode_format,
+                "transcode_quality": self.display.transcode_quality,
+                "transcode_workers": self.display.transcode_workers,
             },
             "subscriptions": {
                 "enabled": self.subscriptions.enabled,
@@ -341,6 +471,12 @@ class PluginConfig:
         
         if self.api.max_retries < 0:
             errors.append("API max_retries不能为负数")
+
+        if self.api.max_concurrent_requests <= 0:
+            errors.append("API max_concurrent_requests必须大于0")
+
+        if self.api.interactive_reserved_slots < 0:
+            errors.append("API interactive_reserved_slots不能为负数")
         
         # 验证过滤配置
         valid_ratings = {"g", "s", "q", "e"}
@@ -354,6 +490,22 @@ class PluginConfig:
         if self.display.search_limit <= 0 or self.display.search_limit > 20:
             errors.append("display.search_limit必须在1-20之间")
 
+        if self.display.max_image_bytes < 0 or self.display.max_image_pixels < 0:
+            errors.append("display.max_image_bytes / max_image_pixels不能为负数")
+
+        if self.display.probe_concurrency <= 0:
+            errors.append("display.probe_concurrency必须大于0")
+
+        if self.display.transcode:
+            if self.display.transcode_max_edge <= 0:
+                errors.append("display.transcode_max_edge必须大于0")
+            if self.display.transcode_format not in ("jpeg", "webp"):
+                errors.append("display.transcode_format必须是jpeg或webp")
+            if not 1 <= self.display.transcode_quality <= 100:
+                errors.append("display.transcode_quality必须在1-100之间")
+            if self.display.transcode_workers <= 0:
+                errors.append("display.transcode_workers必须大于0")
+
         if self.subscriptions.send_interval_minutes < 0:
             errors.append("subscriptions.send_interval_minutes不能为负数")
 
@@ -367,6 +519,48 @@ class PluginConfig:
         if self.cache.max_size <= 0:
             errors.append("cache max_size必须大于0")
 
+        if self.cache.max_bytes < 0:
+            errors.append("cache max_bytes不能为负数")
+
+        if self.cache.compress_threshold < 0:
+            errors.append("cache compress_threshold不能为负数")
+
+        if not 0 <= self.cache.event_sample_rate <= 1:
+            errors.append("cache event_sample_rate必须在0到1之间")
+
+        if min(
+            self.cache.image_probe_ttl,
+            self.cache.image_probe_negative_ttl,
+            self.cache.image_host_cooldown,
+        ) < 0:
+            errors.append("cache image_probe_ttl / image_probe_negative_ttl / image_host_cooldown不能为负数")
+
+        if self.cache.image_store:
+            if not self.cache.image_store_path:
+                errors.append("cache image_store_path不能为空")
+            if self.cache.image_store_max_bytes <= 0:
+                errors.append("cache image_store_max_bytes必须大于0")
+
+        if self.cache.warmup_top_n < 0:
+            errors.append("cache warmup_top_n不能为负数")
+
+        if self.cache.persistent:
+            if not self.cache.persistent_path:
+                errors.append("cache persistent_path不能为空")
+            if self.cache.persistent_max_entries <= 0:
+                errors.append("cache persistent_max_entries必须大于0")
+            if self.cache.persistent_max_bytes < 0:
+                errors.append("cache persistent_max_bytes不能为负数")
+
+        if self.cache.negative_ttl < 0:
+            errors.append("cache negative_ttl不能为负数")
+
+        if self.cache.revalidate_window < 0:
+            errors.append("cache revalidate_window不能为负数")
+
+        if self.cache.entity_cache and self.cache.entity_max_entries <= 0:
+            errors.append("cache entity_max_entries必须大于0")
+
         # 验证代理配置
         if self.proxy.enabled:
             scheme = (self.proxy.scheme or "").lower()
@@ -396,6 +590,22 @@ class PluginConfig:
         return limit
 
 
+def resolve_data_path(relative_path: str) -> str:
+    """将相对路径解析到插件数据目录下"""
+    path = Path(relative_path)
+    if path.is_absolute():
+        return str(path)
+    base_dir = None
+    if StarTools:
+        try:
+            base_dir = StarTools.get_data_dir()
+        except Exception as exc:
+            logger.error(f"获取插件数据目录失败: {exc}")
+    if not base_dir:
+        base_dir = Path(__file__).resolve().parent
+    return str(Path(base_dir) / path)
+
+
 class ConfigManager:
     """配置管理器"""
     
@@ -404,18 +614,7 @@ class ConfigManager:
         self._config: Optional[PluginConfig] = None
 
     def _resolve_path(self, config_path: str) -> str:
-        path = Path(config_path)
-        if path.is_absolute():
-            return str(path)
-        base_dir = None
-        if StarTools:
-            try:
-                base_dir = StarTools.get_data_dir()
-            except Exception as exc:
-                logger.error(f"获取插件数据目录失败: {exc}")
-        if not base_dir:
-            base_dir = Path(__file__).resolve().parent
-        return str(Path(base_dir) / path)
+        return resolve_data_path(config_path)
     
     @property
     def config(self) -> PluginConfig:
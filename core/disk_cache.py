@@ -0,0 +1,324 @@
+"""
+Danbooru API Plugin - 磁盘二级缓存
+基于 SQLite 的持久化响应缓存，插件重启后仍可命中
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import json
+import os
+import sqlite3
+import time
+
+from astrbot.api import logger
+
+
+def create_private_file(path: str) -> None:
+    """创建数据库文件并限制为仅所有者可读写（WAL 与 shm 文件沿用同样的权限）"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+    os.close(fd)
+    try:
+        os.chmod(path, 0o600)
+    except OSError:
+        pass
+
+
+class DiskCache:
+    """SQLite 二级缓存
+
+    - 所有数据库操作在单个工作线程中执行，事件循环不会阻塞在磁盘 IO 上。
+    - 写入先进入内存缓冲区（同键合并），定时或缓冲区满时批量落盘（write-behind）。
+    - 读取时检查过期时间（墙钟时间，跨进程重启有效）。
+    - 落盘后按条目数与字节数裁剪，优先删除过期条目，其次删除最久未访问的条目。
+    - 二级索引表 entry_index 记录条目的索引键，按索引失效走索引查询而非扫描全部键。
+    """
+
+    _schema = (
+        "CREATE TABLE IF NOT EXISTS entries ("
+        " key TEXT PRIMARY KEY,"
+        " value TEXT NOT NULL,"
+        " expires_at REAL NOT NULL,"
+        " size INTEGER NOT NULL,"
+        " accessed_at REAL NOT NULL"
+        ")",
+        "CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries (expires_at)",
+        "CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)",
+        "CREATE TABLE IF NOT EXISTS entry_index ("
+        " index_key TEXT NOT NULL,"
+        " key TEXT NOT NULL,"
+        " PRIMARY KEY (index_key, key)"
+        ") WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS idx_entry_index_key ON entry_index (key)",
+        "CREATE TRIGGER IF NOT EXISTS trg_entries_delete AFTER DELETE ON entries BEGIN"
+        " DELETE FROM entry_index WHERE key = old.key;"
+        " END",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 20000,
+        max_bytes: int = 256 * 1024 * 1024,
+        flush_interval: float = 2.0,
+        flush_batch: int = 200,
+    ):
+        self.path = path
+        self.max_entries = max(int(max_entries), 1)
+        self.max_bytes = max(int(max_bytes or 0), 0)
+        self.flush_interval = flush_interval
+        self.flush_batch = max(int(flush_batch), 1)
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="danbooru-disk-cache")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: Dict[str, Tuple[Any, float, int, Tuple[str, ...]]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._closed = False
+
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+
+    # ==================== 工作线程 ====================
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            create_private_file(self.path)
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self._schema:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _get_sync(self, key: str, now: float) -> Optional[Tuple[str, float, int]]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at, size FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        conn.commit()
+        return row[0], row[1], row[2]
+
+    def _write_sync(self, items: List[Tuple[str, Any, float, int, Tuple[str, ...]]]) -> int:
+        conn = self._connect()
+        now = time.time()
+        rows = []
+        index_rows = []
+        for key, value, expires_at, size, index_keys in items:
+            try:
+                payload = json.dumps(value, ensure_ascii=False)
+            except (TypeError, ValueError, RuntimeError):
+                continue
+            rows.append((key, payload, expires_at, size, now))
+            index_rows.extend((index_key, key) for index_key in index_keys)
+        # REPLACE 不触发删除触发器，先清理旧索引
+        conn.executemany("DELETE FROM entry_index WHERE key = ?", [(row[0],) for row in rows])
+        conn.executemany(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at, size, accessed_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO entry_index (index_key, key) VALUES (?, ?)",
+            index_rows,
+        )
+        self._trim_sync(conn, now)
+        conn.commit()
+        return len(rows)
+
+    def _trim_sync(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        excess = max(count - self.max_entries, 0)
+        if excess:
+            conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if self.max_bytes and total > self.max_bytes:
+            cursor = conn.execute("SELECT key, size FROM entries ORDER BY accessed_at")
+            victims = []
+            for key, size in cursor:
+                if total <= self.max_bytes:
+                    break
+                victims.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def _delete_sync(self, pattern: str) -> int:
+        conn = self._connect()
+        if pattern:
+            # 键为摘要，按索引键（endpoint:/resource:/tag:）匹配
+            cursor = conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entry_index WHERE instr(index_key, ?) > 0)",
+                (pattern,),
+            )
+        else:
+            conn.execute("DELETE FROM entry_index")
+            cursor = conn.execute("DELETE FROM entries")
+        conn.commit()
+        return cursor.rowcount
+
+    def _delete_index_sync(self, index_keys: List[str]) -> int:
+        conn = self._connect()
+        placeholders = ",".join("?" for _ in index_keys)
+        cursor = conn.execute(
+            "DELETE FROM entries WHERE key IN ("
+            f" SELECT key FROM entry_index WHERE index_key IN ({placeholders}))",
+            index_keys,
+        )
+        conn.commit()
+        return cursor.rowcount
+
+    def _stats_sync(self) -> Tuple[int, int]:
+        conn = self._connect()
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return int(count), int(total)
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    # ==================== 公共接口 ====================
+
+    async def get(self, key: str) -> Optional[Tuple[Any, float, int]]:
+        """读取缓存，返回 (value, 剩余 TTL 秒数, 字节数)；未命中或已过期返回 None"""
+        now = time.time()
+        pending = self._pending.get(key)
+        if pending is not None:
+            value, expires_at, size, _ = pending
+            if expires_at > now:
+                self._hits += 1
+                return value, expires_at - now, size
+        try:
+            row = await self._run(self._get_sync, key, now)
+        except sqlite3.Error as exc:
+            logger.warning(f"磁盘缓存读取失败: {exc}")
+            return None
+        if row is None:
+            self._misses += 1
+            return None
+        payload, expires_at, size = row
+        try:
+            value = json.loads(payload)
+        except json.JSONDecodeError:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return value, expires_at - now, size
+
+    def put(
+        self,
+        key: str,
+        value: Any,
+        ttl: float,
+        size: int = 0,
+        index_keys: Iterable[str] = (),
+    ) -> None:
+        """写入缓冲区，稍后批量落盘"""
+        if self._closed or ttl <= 0:
+            return
+        self._pending[key] = (value, time.time() + ttl, int(size), tuple(index_keys))
+        if len(self._pending) >= self.flush_batch:
+            task = asyncio.ensure_future(self.flush())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self) -> int:
+        """将缓冲区写入磁盘"""
+        if not self._pending:
+            return 0
+        items = [(key, *item) for key, item in self._pending.items()]
+        self._pending = {}
+        try:
+            written = await self._run(self._write_sync, items)
+        except sqlite3.Error as exc:
+            logger.warning(f"磁盘缓存写入失败: {exc}")
+            return 0
+        self._writes += written
+        return written
+
+    async def invalidate(self, pattern: str = "") -> int:
+        """删除索引键包含 pattern 的条目；pattern 为空时清空"""
+        if pattern:
+            pending = self._pending.items()
+            for key in [k for k, item in pending if any(pattern in i for i in item[3])]:
+                del self._pending[key]
+        else:
+            self._pending.clear()
+        try:
+            return await self._run(self._delete_sync, pattern)
+        except sqlite3.Error as exc:
+            logger.warning(f"磁盘缓存清理失败: {exc}")
+            return 0
+
+    async def invalidate_index(self, *index_keys: str) -> int:
+        """删除带有任一索引键的条目"""
+        if not index_keys:
+            return 0
+        wanted = set(index_keys)
+        for key in [k for k, item in self._pending.items() if wanted.intersection(item[3])]:
+            del self._pending[key]
+        try:
+            return await self._run(self._delete_index_sync, list(wanted))
+        except sqlite3.Error as exc:
+            logger.warning(f"磁盘缓存清理失败: {exc}")
+            return 0
+
+    async def clear(self) -> int:
+        """清空磁盘缓存"""
+        return await self.invalidate("")
+
+    async def get_stats(self) -> Dict[str, int]:
+        """获取磁盘缓存统计"""
+        try:
+            count, total = await self._run(self._stats_sync)
+        except sqlite3.Error:
+            count, total = 0, 0
+        return {
+            "entries": count,
+            "bytes": total,
+            "pending": len(self._pending),
+            "hits": self._hits,
+            "misses": self._misses,
+            "writes": self._writes,
+        }
+
+    async def close(self) -> None:
+        """落盘剩余数据并关闭"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self.flush()
+        await self._run(self._close_sync)
+        self._executor.shutdown(wait=False)
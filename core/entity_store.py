@@ -0,0 +1,120 @@
+"""
+Danbooru API Plugin - 实体缓存
+以 (资源类型, ID) 为键的规范化实体存储，由列表/搜索响应填充，供单资源查询直接命中
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+import time
+
+
+# 列表端点 -> 资源类型；单资源端点为 "<资源类型>/<id>"
+ENTITY_RESOURCES = ("posts", "tags", "artists", "pools", "users", "wiki_pages")
+
+# 返回帖子列表的其他端点
+_POST_LIST_ENDPOINTS = ("explore/posts",)
+
+# 这些参数会改变返回字段，结果不能当作完整实体
+_PARTIAL_PARAMS = ("only",)
+
+
+def list_resource(endpoint: str, params: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """判断端点是否为可填充实体缓存的列表端点，返回资源类型"""
+    if params and any(key in params for key in _PARTIAL_PARAMS):
+        return None
+    path = endpoint.strip("/").split(".", 1)[0]
+    if path in ENTITY_RESOURCES:
+        return path
+    if any(path.startswith(prefix) for prefix in _POST_LIST_ENDPOINTS):
+        return "posts"
+    return None
+
+
+def single_resource(endpoint: str) -> Optional[Tuple[str, int]]:
+    """判断端点是否为单资源端点，返回 (资源类型, ID)"""
+    parts = endpoint.strip("/").split("/")
+    if len(parts) != 2 or parts[0] not in ENTITY_RESOURCES:
+        return None
+    resource_id = parts[1].split(".", 1)[0]
+    if not resource_id.isdigit():
+        return None
+    return parts[0], int(resource_id)
+
+
+class EntityStore:
+    """实体缓存
+
+    - 写入时记录获取时间，读取时由调用方给出可接受的最大年龄。
+    - 条目数超出上限时按 LRU 淘汰。
+    - 同一实体被新响应覆盖时刷新获取时间。
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max(int(max_entries), 1)
+        self._entities: "OrderedDict[Tuple[str, int], Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def put(self, resource: str, entity: Dict[str, Any], fetched_at: Optional[float] = None) -> bool:
+        """写入单个实体，缺少整数 id 时忽略"""
+        entity_id = entity.get("id") if isinstance(entity, dict) else None
+        if not isinstance(entity_id, int):
+            return False
+        key = (resource, entity_id)
+        self._entities[key] = (entity, time.monotonic() if fetched_at is None else fetched_at)
+        self._entities.move_to_end(key)
+        while len(self._entities) > self.max_entries:
+            self._entities.popitem(last=False)
+        return True
+
+    def put_many(self, resource: str, entities: Iterable[Any]) -> int:
+        """批量写入列表响应中的实体"""
+        now = time.monotonic()
+        return sum(1 for entity in entities if self.put(resource, entity, now))
+
+    def get(self, resource: str, entity_id: int, max_age: float) -> Optional[Dict[str, Any]]:
+        """读取实体；超过 max_age 秒视为未命中"""
+        key = (resource, int(entity_id))
+        item = self._entities.get(key)
+        if item is None:
+            self._misses += 1
+            return None
+        entity, fetched_at = item
+        if time.monotonic() - fetched_at > max_age:
+            del self._entities[key]
+            self._misses += 1
+            return None
+        self._entities.move_to_end(key)
+        self._hits += 1
+        return entity
+
+    def discard(self, resource: str, entity_id: int) -> bool:
+        """移除实体"""
+        return self._entities.pop((resource, int(entity_id)), None) is not None
+
+    def invalidate(self, pattern: str = "") -> int:
+        """移除 "<资源类型>/<id>" 包含 pattern 的实体；pattern 为空时清空"""
+        if not pattern:
+            return self.clear()
+        keys = [key for key in self._entities if pattern in f"{key[0]}/{key[1]}"]
+        for key in keys:
+            del self._entities[key]
+        return len(keys)
+
+    def clear(self) -> int:
+        """清空实体缓存"""
+        count = len(self._entities)
+        self._entities.clear()
+        return count
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取实体缓存统计"""
+        return {
+            "entries": len(self._entities),
+            "max_entries": self.max_entries,
+            "hits": self._hits,
+            "misses": self._misses,
+        }
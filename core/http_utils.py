@@ -2,11 +2,63 @@
 Danbooru API Plugin - HTTP helpers
 """
 
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 import asyncio
-import json
+import heapq
+import itertools
+
+
+class RequestPriority:
+    """请求优先级常量"""
+    INTERACTIVE = "interactive"  # 用户命令
+    BACKGROUND = "background"    # 订阅推送等后台任务
+    BULK = "bulk"                # 预取、批量任务
+
+    ORDER = {INTERACTIVE: 0, BACKGROUND: 1, BULK: 2}
+
+    @classmethod
+    def normalize(cls, value: Optional[str]) -> str:
+        """规范化优先级，未知值视为 interactive"""
+        return value if value in cls.ORDER else cls.INTERACTIVE
+
+
+_current_priority: ContextVar[Optional[str]] = ContextVar(
+    "danbooru_request_priority", default=None
+)
+
+
+@contextmanager
+def request_priority(priority: str) -> Iterator[None]:
+    """在当前上下文内为所有请求设置默认优先级"""
+    token = _current_priority.set(RequestPriority.normalize(priority))
+    try:
+        yield
+    finally:
+        try:
+            _current_priority.reset(token)
+        except ValueError:
+            # 异步生成器在其他上下文中结束时无法 reset，直接恢复原值
+            _current_priority.set(token.old_value if token.old_value is not token.MISSING else None)
+
+
+def current_request_priority() -> str:
+    """获取当前上下文的请求优先级"""
+    return RequestPriority.normalize(_current_priority.get())
+
+
+def response_header(headers: Dict[str, str], name: str) -> Optional[str]:
+    """大小写不敏感地读取响应头"""
+    value = headers.get(name)
+    if value is not None:
+        return value
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
 
 
 @dataclass
@@ -17,128 +69,238 @@ class RequestOptions:
     use_auth: bool = True
     auth_method: str = "header"  # "header" or "params"
     response_format: str = "json"  # "json" or "xml"
+    priority: Optional[str] = None  # None 表示沿用上下文优先级
 
 
 class RateLimiter:
-    """速率限制器"""
+    """令牌桶速率限制器
+
+    允许在桶容量内突发请求，并按恢复速率补充令牌。interactive 请求令牌不足时先预占令牌，
+    再在锁外等待，避免持锁睡眠导致所有调用方串行排队；background / bulk 请求只在令牌充足
+    且没有 interactive 请求等待时取用，不会透支令牌桶，交互请求不必排在它们的预占之后。
+    桶容量与恢复速率会根据服务端返回的 x-rate-limit 头动态调整。
+    """
 
-    def __init__(self, requests_per_second: int = 10):
+    def __init__(self, requests_per_second: int = 10, burst: Optional[int] = None):
         self.requests_per_second = requests_per_second
         self.min_interval = 1.0 / requests_per_second
-        self._last_request_time: float = 0
+        self.rate: float = float(requests_per_second)
+        self.capacity: float = float(burst or requests_per_second)
+        self._tokens: float = self.capacity
+        self._updated_at: Optional[float] = None
         self._lock = asyncio.Lock()
+        self._interactive_waiting = 0
 
-    async def acquire(self) -> None:
-        """获取请求许可"""
+    def _refill(self, now: float) -> None:
+        """按经过时间补充令牌"""
+        if self._updated_at is not None:
+            elapsed = now - self._updated_at
+            if elapsed > 0:
+                self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, priority: Optional[str] = None) -> None:
+        """获取请求许可；priority 为空时使用当前上下文的优先级"""
+        if RequestPriority.normalize(priority or current_request_priority()) != RequestPriority.INTERACTIVE:
+            await self._acquire_spare()
+            return
         async with self._lock:
-            now = asyncio.get_event_loop().time()
-            elapsed = now - self._last_request_time
+            self._refill(asyncio.get_running_loop().time())
+            self._tokens -= 1
+            deficit = -self._tokens
 
-            if elapsed < self.min_interval:
-                wait_time = self.min_interval - elapsed
-                await asyncio.sleep(wait_time)
+        # 令牌已预占，在锁外等待补充
+        if deficit > 0:
+            self._interactive_waiting += 1
+            try:
+                await asyncio.sleep(deficit / self.rate)
+            finally:
+                self._interactive_waiting -= 1
 
-            self._last_request_time = asyncio.get_event_loop().time()
+    async def _acquire_spare(self) -> None:
+        """只取用空闲令牌：令牌不足或有 interactive 请求等待时，等到令牌补充后再试"""
+        while True:
+            async with self._lock:
+                self._refill(asyncio.get_running_loop().time())
+                if self._tokens >= 1 and not self._interactive_waiting:
+                    self._tokens -= 1
+                    return
+                wait = max((1 - self._tokens) / self.rate, self.min_interval)
+            await asyncio.sleep(wait)
 
     def update_rate(self, new_rate: int) -> None:
         """更新速率限制"""
         self.requests_per_second = new_rate
         self.min_interval = 1.0 / new_rate
+        self.rate = float(new_rate)
 
+    def sync_with_server(
+        self,
+        burst_pool: Optional[float] = None,
+        recharge_rate: Optional[float] = None,
+        remaining: Optional[float] = None,
+    ) -> None:
+        """根据服务端速率限制信息调整令牌桶
 
-class ResponseCache:
-    """响应缓存"""
+        恢复速率不超过本地配置的 requests_per_second；
+        剩余令牌数只会向下校正，避免本地估算超过上游额度。
+        """
+        self._refill(asyncio.get_running_loop().time())
+        if burst_pool is not None and burst_pool > 0:
+            self.capacity = float(burst_pool)
+            self._tokens = min(self._tokens, self.capacity)
+        if recharge_rate is not None and recharge_rate > 0:
+            self.rate = min(float(recharge_rate), float(self.requests_per_second))
+        if remaining is not None and remaining >= 0:
+            self._tokens = min(self._tokens, float(remaining))
 
-    def __init__(self, max_size: int = 1000, default_ttl: int = 300):
-        self.max_size = max_size
-        self.default_ttl = default_ttl
-        self._cache: Dict[str, tuple] = {}  # key -> (value, expires_at)
-        self._lock = asyncio.Lock()
+    def penalize(self, seconds: float) -> None:
+        """收到 429 后清空令牌，使后续请求至少等待指定时间"""
+        self._refill(asyncio.get_running_loop().time())
+        self._tokens = min(self._tokens, 1.0 - max(seconds, 0.0) * self.rate)
 
-    def _generate_key(self, method: str, url: str, params: Optional[Dict] = None) -> str:
-        """生成缓存键"""
-        key_parts = [method.upper(), url]
-        if params:
-            sorted_params = sorted(params.items())
-            key_parts.append(str(sorted_params))
-        return ":".join(key_parts)
-
-    async def get(self, method: str, url: str, params: Optional[Dict] = None) -> Optional[Any]:
-        """获取缓存"""
-        key = self._generate_key(method, url, params)
-        async with self._lock:
-            if key in self._cache:
-                value, expires_at = self._cache[key]
-                if datetime.now() < expires_at:
-                    return value
-                del self._cache[key]
-        return None
-
-    async def set(
-        self,
-        method: str,
-        url: str,
-        value: Any,
-        params: Optional[Dict] = None,
-        ttl: Optional[int] = None,
-    ) -> None:
-        """设置缓存"""
-        key = self._generate_key(method, url, params)
-        expires_at = datetime.now() + timedelta(seconds=ttl or self.default_ttl)
+    async def close(self) -> None:
+        """释放资源（本地令牌桶无需处理）"""
 
-        async with self._lock:
-            if len(self._cache) >= self.max_size:
-                await self._cleanup()
-            self._cache[key] = (value, expires_at)
-
-    async def _cleanup(self) -> None:
-        """清理过期缓存"""
-        now = datetime.now()
-        expired_keys = [
-            key for key, (_, expires_at) in self._cache.items()
-            if now >= expires_at
-        ]
-        for key in expired_keys:
-            del self._cache[key]
-
-        if len(self._cache) >= self.max_size:
-            sorted_items = sorted(self._cache.items(), key=lambda x: x[1][1])
-            for key, _ in sorted_items[:len(self._cache) - self.max_size + 1]:
-                del self._cache[key]
-
-    def _estimate_entry_size(self, key: str, value: Any) -> int:
-        """估算缓存条目占用大小（字节）"""
+    def get_stats(self) -> Dict[str, float]:
+        """获取令牌桶状态"""
+        return {
+            "tokens": round(self._tokens, 2),
+            "capacity": self.capacity,
+            "rate": self.rate,
+        }
+
+
+class PriorityScheduler:
+    """按优先级分配上游并发槽位
+
+    interactive 可使用全部槽位并优先出队；background 只能使用保留槽位之外的容量，
+    且仅在没有更高优先级请求排队时启动；bulk 最多使用 background 容量的一半。
+    """
+
+    def __init__(self, max_concurrency: int = 5, reserved_interactive: int = 1):
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.reserved_interactive = min(
+            max(int(reserved_interactive), 0), self.max_concurrency - 1
+        )
+        background_limit = max(self.max_concurrency - self.reserved_interactive, 1)
+        self._limits = {
+            RequestPriority.INTERACTIVE: self.max_concurrency,
+            RequestPriority.BACKGROUND: background_limit,
+            RequestPriority.BULK: max(background_limit // 2, 1),
+        }
+        self._active = 0
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._served: Dict[str, int] = {key: 0 for key in RequestPriority.ORDER}
+
+    def _can_start(self, priority: str) -> bool:
+        return self._active < self._limits[priority]
+
+    def _wake(self) -> None:
+        """按优先级唤醒等待者；队首无法启动时，低优先级也无法启动"""
+        while self._waiters:
+            _, _, priority, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._can_start(priority):
+                break
+            heapq.heappop(self._waiters)
+            self._active += 1
+            self._served[priority] += 1
+            future.set_result(None)
+
+    async def acquire(self, priority: str) -> None:
+        """获取槽位"""
+        priority = RequestPriority.normalize(priority)
+        if not self._waiters and self._can_start(priority):
+            self._active += 1
+            self._served[priority] += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters,
+            (RequestPriority.ORDER[priority], next(self._seq), priority, future),
+        )
+        self._wake()
         try:
-            payload = json.dumps(value, ensure_ascii=False)
-        except (TypeError, ValueError):
-            payload = str(value)
-        return len(key.encode("utf-8")) + len(payload.encode("utf-8"))
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已分配槽位但调用方被取消，归还槽位
+                self.release()
+            raise
 
-    async def clear_with_stats(self) -> Dict[str, int]:
-        """清空缓存并返回统计"""
-        async with self._lock:
-            count = len(self._cache)
-            size_bytes = sum(
-                self._estimate_entry_size(key, value)
-                for key, (value, _) in self._cache.items()
-            )
-            self._cache.clear()
-            return {"count": count, "size_bytes": size_bytes}
-
-    async def clear(self) -> None:
-        """清空缓存"""
-        async with self._lock:
-            self._cache.clear()
+    def release(self) -> None:
+        """释放槽位"""
+        self._active = max(self._active - 1, 0)
+        self._wake()
 
-    async def invalidate(self, pattern: str = "") -> int:
-        """使匹配模式的缓存失效"""
-        async with self._lock:
-            if not pattern:
-                count = len(self._cache)
-                self._cache.clear()
-                return count
-
-            keys_to_delete = [k for k in self._cache if pattern in k]
-            for key in keys_to_delete:
-                del self._cache[key]
-            return len(keys_to_delete)
+    @asynccontextmanager
+    async def slot(self, priority: str) -> AsyncIterator[None]:
+        """以上下文管理器方式占用槽位"""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度统计"""
+        waiting = {key: 0 for key in RequestPriority.ORDER}
+        for _, _, priority, future in self._waiters:
+            if not future.done():
+                waiting[priority] += 1
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "waiting": waiting,
+            "served": dict(self._served),
+        }
+
+
+class SingleFlight:
+    """合并相同键的并发请求，只向上游发送一次"""
+
+    def __init__(self):
+        self._calls: Dict[str, Tuple[asyncio.Task, str]] = {}
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        """当前进行中的请求数"""
+        return len(self._calls)
+
+    def is_running(self, key: str) -> bool:
+        """指定键是否有进行中的请求"""
+        return key in self._calls
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]], priority: Optional[str] = None) -> Any:
+        """执行请求；若相同键的请求正在进行，则等待其结果
+
+        进行中的请求优先级低于调用方时不合并：以调用方优先级重新发起并接替该键，
+        避免交互请求排在后台或批量请求之后；原请求照常完成。
+        """
+        priority = RequestPriority.normalize(priority or current_request_priority())
+        call = self._calls.get(key)
+        if call is not None and RequestPriority.ORDER[call[1]] <= RequestPriority.ORDER[priority]:
+            self.coalesced += 1
+            return await asyncio.shield(call[0])
+
+        # 任务创建时复制当前上下文，其请求优先级与登记的优先级一致
+        with request_priority(priority):
+            task = asyncio.ensure_future(factory())
+        self._calls[key] = (task, priority)
+        task.add_done_callback(lambda done: self._finish(key, done))
+        # 使用 shield，调用方被取消时不影响其他等待者
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        call = self._calls.get(key)
+        if call is not None and call[0] is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # 取走异常，避免无人等待时输出未检索警告
+            task.exception()
@@ -0,0 +1,269 @@
+"""
+Danbooru API Plugin - 本地图片缓存
+按帖子 md5 与图片规格（preview / sample / original）寻址的磁盘 LRU，
+同一图片只从 CDN 下载一次，之后以本地文件发送给各聊天平台
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+import asyncio
+import hashlib
+import os
+import re
+
+from astrbot.api import logger
+
+
+# 帖子字段 -> 图片规格
+IMAGE_VARIANTS = {
+    "preview_file_url": "preview",
+    "large_file_url": "sample",
+    "file_url": "original",
+}
+
+# 流式写入的块大小
+CHUNK_SIZE = 64 * 1024
+
+# 单张图片最多占字节预算的比例，超过的图片直接发送 URL
+MAX_FILE_RATIO = 0.25
+
+_MD5_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+_EXT_PATTERN = re.compile(r"^[0-9a-z]{1,5}$")
+
+
+async def single_flight(
+    inflight: Dict[str, "asyncio.Future[Optional[str]]"],
+    key: str,
+    factory: Callable[[], Awaitable[Optional[str]]],
+) -> Optional[str]:
+    """同一 key 的并发调用只执行一次 factory，其余调用等待其结果
+
+    发起者被取消时等待者得到 None（回退到远程地址），其他异常原样传给等待者；
+    future 总会被完成，等待者不会因发起者的异常而挂起或被连带取消。
+    """
+    future = inflight.get(key)
+    if future is not None:
+        return await asyncio.shield(future)
+    future = asyncio.get_running_loop().create_future()
+    inflight[key] = future
+    try:
+        result = await factory()
+    except asyncio.CancelledError:
+        future.set_result(None)
+        raise
+    except Exception as exc:
+        future.set_exception(exc)
+        # 取走异常，避免无人等待时输出未检索警告
+        future.exception()
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        inflight.pop(key, None)
+
+
+def image_key(post: Dict[str, Any], url: str) -> Optional[str]:
+    """图片的存储文件名：{md5}-{规格}.{扩展名}；缺少 md5（受限帖子）或地址不属于该帖子时返回 None"""
+    md5 = str(post.get("md5") or "").lower()
+    if not _MD5_PATTERN.match(md5):
+        return None
+    variant = next((name for field, name in IMAGE_VARIANTS.items() if post.get(field) == url), None)
+    if variant is None:
+        return None
+    ext = Path(urlsplit(url).path).suffix.lstrip(".").lower()
+    if not _EXT_PATTERN.match(ext):
+        return None
+    return f"{md5}-{variant}.{ext}"
+
+
+class ImageStore:
+    """本地图片缓存
+
+    - 文件按 md5 前两位分目录存放，内存中维护 文件名 -> 字节数 的 LRU 索引，
+      首次使用时扫描目录按修改时间重建；命中时更新修改时间，重启后仍保持访问顺序。
+    - 下载流式写入临时文件，完成后原子改名；原图在写入过程中校验 md5，不一致时丢弃。
+    - 同一图片的并发请求只下载一次；总字节数超过 max_bytes 时删除最久未使用的文件。
+    - 文件读写在工作线程中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, root: str, max_bytes: int = 512 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max(int(max_bytes), 0)
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._inflight: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+        self.hits = 0
+        self.downloads = 0
+        self.download_bytes = 0
+        self.failures = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    # ==================== 索引 ====================
+
+    def _scan_sync(self) -> "OrderedDict[str, int]":
+        files = []
+        if self.root.exists():
+            for path in self.root.glob("*/*"):
+                if path.suffix == ".part":
+                    path.unlink(missing_ok=True)
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, path.name, stat.st_size))
+        files.sort()
+        return OrderedDict((name, size) for _, name, size in files)
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            self._index = await asyncio.to_thread(self._scan_sync)
+            self._bytes = sum(self._index.values())
+            self._loaded = True
+            await self._evict()
+
+    async def _evict(self) -> None:
+        victims = []
+        while self.max_bytes and self._bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._bytes -= size
+            victims.append(self._path(key))
+        if victims:
+            self.evictions += len(victims)
+            await asyncio.to_thread(lambda: [path.unlink(missing_ok=True) for path in victims])
+
+    # ==================== 读取与下载 ====================
+
+    async def get(self, key: str) -> Optional[str]:
+        """已缓存图片的本地路径"""
+        await self._ensure_loaded()
+        if key not in self._index:
+            return None
+        path = self._path(key)
+        try:
+            await asyncio.to_thread(os.utime, path)
+        except OSError:
+            # 文件已被外部删除
+            self._bytes -= self._index.pop(key, 0)
+            return None
+        self._index.move_to_end(key)
+        self.hits += 1
+        return str(path)
+
+    async def fetch(self, session: Any, url: str, key: str, headers: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """返回图片的本地路径，未缓存时下载；下载失败或图片过大时返回 None"""
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+        return await single_flight(
+            self._inflight, key, lambda: self._download(session, url, key, headers or {})
+        )
+
+    async def _download(self, session: Any, url: str, key: str, headers: Dict[str, str]) -> Optional[str]:
+        path = self._path(key)
+        tmp_path = path.with_name(path.name + ".part")
+        max_file_bytes = int(self.max_bytes * MAX_FILE_RATIO) if self.max_bytes else 0
+        digest = hashlib.md5() if key.split("-", 1)[1].startswith("original.") else None
+        size = 0
+        try:
+            async with session.get(url, headers=headers) as resp:
+                if resp.status != 200:
+                    self.failures += 1
+                    return None
+                if max_file_bytes and (resp.content_length or 0) > max_file_bytes:
+                    return None
+                await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+                fh = await asyncio.to_thread(open, tmp_path, "wb")
+                try:
+                    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                        size += len(chunk)
+                        if max_file_bytes and size > max_file_bytes:
+                            break
+                        if digest is not None:
+                            digest.update(chunk)
+                        await asyncio.to_thread(fh.write, chunk)
+                finally:
+                    await asyncio.to_thread(fh.close)
+            if max_file_bytes and size > max_file_bytes:
+                await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+                return None
+            if digest is not None and digest.hexdigest() != key.split("-", 1)[0]:
+                logger.warning(f"[danbooru] 图片校验失败，已丢弃: {url}")
+                self.failures += 1
+                await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+                return None
+            await asyncio.to_thread(os.replace, tmp_path, path)
+        except asyncio.CancelledError:
+            await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+            raise
+        except Exception as exc:
+            logger.debug(f"[danbooru] 下载图片失败 {url}: {exc}")
+            self.failures += 1
+            await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+            return None
+
+        self.downloads += 1
+        self.download_bytes += size
+        return await self._add(key, size)
+
+    async def _add(self, key: str, size: int) -> Optional[str]:
+        self._bytes -= self._index.pop(key, 0)
+        self._index[key] = size
+        self._bytes += size
+        await self._evict()
+        return str(self._path(key)) if key in self._index else None
+
+    def temp_path(self, key: str) -> str:
+        """生成 key 对应文件时使用的临时路径（写完后交给 adopt）"""
+        path = self._path(key)
+        return str(path.with_name(path.name + ".part"))
+
+    async def adopt(self, key: str, tmp_path: str) -> Optional[str]:
+        """将已写好的临时文件纳入缓存（如转码结果），返回本地路径"""
+        await self._ensure_loaded()
+        path = self._path(key)
+
+        def _move() -> int:
+            os.replace(tmp_path, path)
+            return path.stat().st_size
+
+        try:
+            size = await asyncio.to_thread(_move)
+        except OSError as exc:
+            logger.debug(f"[danbooru] 写入图片缓存失败 {key}: {exc}")
+            return None
+        return await self._add(key, size)
+
+    async def clear(self) -> int:
+        """删除全部缓存图片，返回删除的文件数"""
+        await self._ensure_loaded()
+        paths = [self._path(key) for key in self._index]
+        self._index.clear()
+        self._bytes = 0
+        await asyncio.to_thread(lambda: [path.unlink(missing_ok=True) for path in paths])
+        return len(paths)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计"""
+        return {
+            "entries": len(self._index),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "downloads": self.downloads,
+            "download_bytes": self.download_bytes,
+            "failures": self.failures,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,195 @@
+"""
+Danbooru API Plugin - 图片转码
+发送前将大图缩放并重新编码（JPEG / WebP），在进程池中执行，事件循环不做 CPU 密集工作；
+结果按 (md5, 转码参数) 存入本地图片缓存
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Set
+import asyncio
+import multiprocessing
+import os
+import time
+
+from astrbot.api import logger
+
+from .image_store import ImageStore, single_flight
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+
+# 转码输出格式 -> 文件扩展名
+TRANSCODE_FORMATS = {"jpeg": "jpg", "webp": "webp"}
+
+# 小于该字节数的图片直接发送，不值得启动转码
+MIN_TRANSCODE_BYTES = 256 * 1024
+
+# 动图与视频缩略图不转码
+SKIP_EXTS = {"gif", "apng", "mp4", "webm", "zip", "swf"}
+
+# 记录“转码后不更小”的图片数上限，超过后清空
+MAX_PASSTHROUGH = 10000
+
+
+def _process_context() -> "multiprocessing.context.BaseContext":
+    """工作进程的启动方式：宿主是多线程的事件循环进程，fork 可能复制他人持有的锁导致子进程死锁，
+    因此使用 forkserver（不支持时用 spawn）；子进程按模块路径导入 _transcode_file"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _transcode_file(src: str, dst: str, max_edge: int, fmt: str, quality: int) -> Optional[int]:
+    """在工作进程中执行：缩放并编码到 dst，返回输出字节数；动图或结果不更小时返回 None"""
+    source_size = os.path.getsize(src)
+    with Image.open(src) as source:
+        if getattr(source, "is_animated", False):
+            return None
+        # JPEG 解码时直接按 2 的幂缩小，显著减少大图的解码时间与内存
+        source.draft("RGB", (max_edge, max_edge))
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        elif fmt == "webp" and image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if fmt == "jpeg":
+            image.save(dst, format="JPEG", quality=quality, optimize=True, progressive=True)
+        else:
+            image.save(dst, format="WEBP", quality=quality, method=4)
+    size = os.path.getsize(dst)
+    if size >= source_size:
+        os.remove(dst)
+        return None
+    return size
+
+
+class ImageTranscoder:
+    """发送前的图片转码
+
+    - 长边超过 max_edge 的图片等比缩小，按 fmt / quality 重新编码；小于 MIN_TRANSCODE_BYTES 的图片、
+      动图以及转码后不更小的图片原样发送。
+    - 转码在 ProcessPoolExecutor 中执行（首次使用时创建，workers 个 forkserver / spawn 进程），
+      同一输出并发请求只转码一次。
+    - 输出文件名为 {md5}-{规格}@{参数}.{扩展名}，与原图一起由 ImageStore 管理字节预算与淘汰。
+    - 未安装 Pillow 时不可用（available() 为 False）。
+    """
+
+    def __init__(
+        self,
+        store: ImageStore,
+        max_edge: int = 2048,
+        fmt: str = "jpeg",
+        quality: int = 85,
+        workers: int = 2,
+    ):
+        self.store = store
+        self.max_edge = max(int(max_edge), 1)
+        self.fmt = fmt if fmt in TRANSCODE_FORMATS else "jpeg"
+        self.quality = min(max(int(quality), 1), 100)
+        self.workers = max(int(workers), 1)
+        self.profile = f"{self.max_edge}{self.fmt}{self.quality}"
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+        self._passthrough: Set[str] = set()
+        self.transcoded = 0
+        self.passthrough = 0
+        self.failures = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._seconds = 0.0
+
+    @staticmethod
+    def available() -> bool:
+        """是否已安装 Pillow"""
+        return Image is not None
+
+    def output_key(self, key: str) -> str:
+        """转码结果的存储文件名"""
+        stem = key.rsplit(".", 1)[0]
+        return f"{stem}@{self.profile}.{TRANSCODE_FORMATS[self.fmt]}"
+
+    async def transcode(self, key: str, path: str) -> str:
+        """返回要发送的本地文件：转码结果，或无需转码时的原文件"""
+        if key.rsplit(".", 1)[-1] in SKIP_EXTS or key in self._passthrough:
+            return path
+        output_key = self.output_key(key)
+        cached = await self.store.get(output_key)
+        if cached is not None:
+            return cached
+        result = await single_flight(
+            self._inflight, output_key, lambda: self._transcode(key, path, output_key)
+        )
+        return result or path
+
+    async def _transcode(self, key: str, path: str, output_key: str) -> Optional[str]:
+        try:
+            source_size = await asyncio.to_thread(os.path.getsize, path)
+        except OSError:
+            return None
+        if source_size < MIN_TRANSCODE_BYTES:
+            self._mark_passthrough(key)
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_process_context())
+        tmp_path = self.store.temp_path(output_key)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            size = await loop.run_in_executor(
+                self._executor, _transcode_file, path, tmp_path, self.max_edge, self.fmt, self.quality
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.debug(f"[danbooru] 图片转码失败 {key}: {exc}")
+            self.failures += 1
+            await asyncio.to_thread(self._discard, tmp_path)
+            self._mark_passthrough(key)
+            return None
+        self._seconds += time.perf_counter() - start
+        if size is None:
+            self._mark_passthrough(key)
+            return None
+        self.transcoded += 1
+        self.bytes_in += source_size
+        self.bytes_out += size
+        return await self.store.adopt(output_key, tmp_path)
+
+    @staticmethod
+    def _discard(tmp_path: str) -> None:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    def _mark_passthrough(self, key: str) -> None:
+        if len(self._passthrough) >= MAX_PASSTHROUGH:
+            self._passthrough.clear()
+        self._passthrough.add(key)
+        self.passthrough += 1
+
+    def close(self) -> None:
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计"""
+        return {
+            "profile": self.profile,
+            "transcoded": self.transcoded,
+            "passthrough": self.passthrough,
+            "failures": self.failures,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": self.bytes_in / self.bytes_out if self.bytes_out else 0.0,
+            "avg_ms": round(self._seconds / self.transcoded * 1000, 1) if self.transcoded else 0.0,
+        }
@@ -136,6 +136,7 @@ class APIResponse(Generic[T]):
     status_code: int = 200
     headers: Dict[str, str] = field(default_factory=dict)
     rate_limit: Optional[RateLimitInfo] = None
+    size_bytes: int = 0  # 响应体字节数
     
     @classmethod
     def success_response(cls, data: T, status_code: int = 200, headers: Dict[str, str] = None) -> 'APIResponse[T]':
@@ -0,0 +1,115 @@
+"""
+Danbooru API Plugin - 图片地址可达性缓存
+记录图片 URL 的探测结果（正/负结果分别设置 TTL），并按主机统计连续失败，
+不可用的 CDN 主机在冷却期内直接跳过，不再发出探测请求
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import time
+
+
+# 同一主机连续失败该次数后进入冷却
+HOST_FAILURE_THRESHOLD = 3
+
+
+@dataclass
+class HostState:
+    """单个主机的失败状态"""
+    failures: int = 0
+    down_until: float = 0.0
+
+
+class ReachabilityCache:
+    """图片 URL 可达性缓存
+
+    - 可访问的 URL 缓存 ttl 秒，不可访问（4xx）的缓存 negative_ttl 秒，0 表示不缓存对应结果。
+    - 连接错误、超时与 5xx 记为主机失败；连续 HOST_FAILURE_THRESHOLD 次后该主机在
+      host_cooldown 秒内的所有 URL 直接判定为不可访问，成功一次即清零。
+    - 条目数超过 max_entries 时按 LRU 淘汰。
+    """
+
+    def __init__(
+        self,
+        ttl: int = 600,
+        negative_ttl: int = 60,
+        host_cooldown: int = 120,
+        max_entries: int = 5000,
+    ):
+        self.ttl = max(ttl, 0)
+        self.negative_ttl = max(negative_ttl, 0)
+        self.host_cooldown = max(host_cooldown, 0)
+        self.max_entries = max(max_entries, 1)
+        self._entries: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+        self._hosts: Dict[str, HostState] = {}
+        self.hits = 0
+        self.negative_hits = 0
+        self.host_skips = 0
+        self.probes = 0
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def get(self, url: str) -> Optional[bool]:
+        """缓存的可达性；None 表示需要探测"""
+        now = time.monotonic()
+        entry = self._entries.get(url)
+        if entry is not None:
+            reachable, expires_at = entry
+            if expires_at > now:
+                self._entries.move_to_end(url)
+                if reachable:
+                    self.hits += 1
+                else:
+                    self.negative_hits += 1
+                return reachable
+            del self._entries[url]
+        host = self._hosts.get(self._host(url))
+        if host is not None and host.down_until > now:
+            self.host_skips += 1
+            return False
+        return None
+
+    def record(self, url: str, reachable: bool, host_failure: bool = False) -> None:
+        """记录一次探测结果；host_failure 表示失败源于主机（连接错误、超时、5xx）"""
+        self.probes += 1
+        now = time.monotonic()
+        host_name = self._host(url)
+        if host_failure:
+            host = self._hosts.setdefault(host_name, HostState())
+            host.failures += 1
+            if host.failures >= HOST_FAILURE_THRESHOLD and self.host_cooldown:
+                host.down_until = now + self.host_cooldown
+                host.failures = 0
+            # 主机故障不代表 URL 本身失效，不写入负缓存
+            return
+        self._hosts.pop(host_name, None)
+        ttl = self.ttl if reachable else self.negative_ttl
+        if ttl <= 0:
+            self._entries.pop(url, None)
+            return
+        self._entries[url] = (reachable, now + ttl)
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存与主机状态"""
+        self._entries.clear()
+        self._hosts.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计"""
+        now = time.monotonic()
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "host_skips": self.host_skips,
+            "probes": self.probes,
+            "probes_avoided": self.hits + self.negative_hits + self.host_skips,
+            "hosts_down": sum(1 for host in self._hosts.values() if host.down_until > now),
+        }
@@ -0,0 +1,224 @@
+"""
+Danbooru API Plugin - 跨进程共享状态
+同机多个 AstrBot 进程通过同一个 SQLite（WAL）文件共享响应缓存与上游速率额度
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import sqlite3
+import time
+
+from astrbot.api import logger
+
+from .config import resolve_data_path
+from .disk_cache import create_private_file
+from .http_utils import RateLimiter, RequestPriority, current_request_priority
+
+
+# 未配置 cache.shared_path 时使用的路径（相对插件数据目录，同一数据目录下的进程一致）
+SHARED_PATH = "cache/shared.sqlite3"
+
+# 等待其他进程释放写锁的最长秒数
+BUSY_TIMEOUT = 10.0
+
+# 共享数据库出错后改用本进程令牌桶的时长（秒），之后重新尝试共享数据库
+RETRY_SHARED_AFTER = 30.0
+
+
+def default_shared_path() -> str:
+    """默认共享数据库路径"""
+    return resolve_data_path(SHARED_PATH)
+
+
+class SharedRateLimiter(RateLimiter):
+    """跨进程共享的令牌桶
+
+    - 桶状态（令牌数、更新时间、容量、恢复速率）存于共享数据库的 rate_buckets 表，
+      同名桶的所有进程共用一份上游额度；桶名由调用方按 API 地址与账号区分。
+    - 每次 acquire 在 BEGIN IMMEDIATE 事务中补充并预占令牌，事务在工作线程执行，不阻塞事件循环；
+      令牌不足时与本地令牌桶一样在事务外等待。
+    - 补充按墙钟时间计算，跨进程一致。
+    - 数据库出错时在 RETRY_SHARED_AFTER 秒内退回本进程令牌桶，之后自动重试共享数据库。
+    """
+
+    _schema = (
+        "CREATE TABLE IF NOT EXISTS rate_buckets ("
+        " name TEXT PRIMARY KEY,"
+        " tokens REAL NOT NULL,"
+        " updated_at REAL NOT NULL,"
+        " capacity REAL NOT NULL,"
+        " rate REAL NOT NULL"
+        ")",
+    )
+
+    def __init__(self, path: str, name: str, requests_per_second: int = 10, burst: Optional[int] = None):
+        super().__init__(requests_per_second, burst)
+        self.path = path
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="danbooru-rate-limit")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._fallback_until = 0.0
+        self.fallbacks = 0
+
+    # ==================== 工作线程 ====================
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            create_private_file(self.path)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self._schema:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def _update_sync(
+        self,
+        consume: float,
+        capacity: Optional[float] = None,
+        rate: Optional[float] = None,
+        max_tokens: Optional[float] = None,
+        spare_only: bool = False,
+    ) -> Tuple[float, float, float]:
+        """补充共享桶并扣除 consume 个令牌，返回 (令牌数, 容量, 恢复速率)
+
+        spare_only 时令牌不足则不扣除，返回的令牌数为扣除后将达到的负值，调用方据此等待后重试。
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated_at, capacity, rate FROM rate_buckets WHERE name = ?",
+                (self.name,),
+            ).fetchone()
+            if row is None:
+                tokens, current_capacity, current_rate = self.capacity, self.capacity, self.rate
+            else:
+                tokens, updated_at, current_capacity, current_rate = row
+                tokens = min(current_capacity, tokens + max(now - updated_at, 0.0) * current_rate)
+            if capacity is not None:
+                current_capacity = capacity
+                tokens = min(tokens, current_capacity)
+            if rate is not None:
+                current_rate = rate
+            if max_tokens is not None:
+                tokens = min(tokens, max_tokens)
+            granted = not spare_only or tokens >= consume
+            if granted:
+                tokens -= consume
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (name, tokens, updated_at, capacity, rate)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self.name, tokens, now, current_capacity, current_rate),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return (tokens if granted else tokens - consume), current_capacity, current_rate
+
+    # ==================== 事件循环侧 ====================
+
+    async def _run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    def _apply(self, state: Tuple[float, float, float]) -> None:
+        self._tokens, self.capacity, self.rate = state
+        self._updated_at = asyncio.get_running_loop().time()
+
+    @property
+    def _fallback(self) -> bool:
+        return time.monotonic() < self._fallback_until
+
+    def _disable(self, exc: Exception) -> None:
+        if not self._fallback:
+            logger.warning(
+                f"共享速率限制不可用，{RETRY_SHARED_AFTER:.0f} 秒内改用本进程令牌桶: {exc}"
+            )
+            self.fallbacks += 1
+        self._fallback_until = time.monotonic() + RETRY_SHARED_AFTER
+
+    def _push(self, **changes: Optional[float]) -> None:
+        """将本地校正异步写入共享桶（单线程执行器保证与 acquire 的先后顺序）"""
+        if self._fallback or all(value is None for value in changes.values()):
+            return
+        future = self._run(self._update_sync, 0.0, **changes)
+        task = asyncio.ensure_future(future)
+        task.add_done_callback(self._pushed)
+
+    def _pushed(self, task: "asyncio.Future[Tuple[float, float, float]]") -> None:
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if isinstance(exc, sqlite3.Error):
+            self._disable(exc)
+        elif exc is None:
+            self._apply(task.result())
+
+    async def acquire(self, priority: Optional[str] = None) -> None:
+        """从共享桶获取请求许可；background / bulk 只取用空闲令牌，不透支共享桶"""
+        spare_only = RequestPriority.normalize(priority or current_request_priority()) != RequestPriority.INTERACTIVE
+        while True:
+            if self._fallback:
+                await super().acquire(priority)
+                return
+            try:
+                state = await self._run(self._update_sync, 1.0, spare_only=spare_only)
+            except sqlite3.Error as exc:
+                self._disable(exc)
+                continue
+            if spare_only and state[0] < 0:
+                # 未取得令牌：等待补足后重试（期间其他进程的交互请求可能先取走）
+                await asyncio.sleep(max(-state[0] / state[2], self.min_interval))
+                continue
+            self._apply(state)
+            if self._tokens < 0:
+                await asyncio.sleep(-self._tokens / self.rate)
+            return
+
+    def update_rate(self, new_rate: int) -> None:
+        """更新速率限制"""
+        super().update_rate(new_rate)
+        self._push(rate=self.rate)
+
+    def sync_with_server(
+        self,
+        burst_pool: Optional[float] = None,
+        recharge_rate: Optional[float] = None,
+        remaining: Optional[float] = None,
+    ) -> None:
+        """根据服务端速率限制信息校正本地与共享桶"""
+        super().sync_with_server(burst_pool, recharge_rate, remaining)
+        self._push(
+            capacity=self.capacity if burst_pool is not None and burst_pool > 0 else None,
+            rate=self.rate if recharge_rate is not None and recharge_rate > 0 else None,
+            max_tokens=float(remaining) if remaining is not None and remaining >= 0 else None,
+        )
+
+    def penalize(self, seconds: float) -> None:
+        """收到 429 后清空共享桶，所有进程都等待指定时间"""
+        super().penalize(seconds)
+        self._push(max_tokens=1.0 - max(seconds, 0.0) * self.rate)
+
+    async def close(self) -> None:
+        """关闭数据库连接"""
+        def _close() -> None:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        try:
+            await self._run(_close)
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取令牌桶状态"""
+        stats = super().get_stats()
+        stats["shared"] = not self._fallback
+        stats["fallbacks"] = self.fallbacks
+        return stats
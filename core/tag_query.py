@@ -0,0 +1,63 @@
+"""
+Danbooru API Plugin - 标签查询规范化
+将语义相同的标签搜索归一为同一字符串，使缓存、请求合并与订阅共用同一个键
+"""
+
+from typing import List
+
+
+# 位置敏感或只取其一的元标签：保留原有相对顺序，排在普通条件之后
+ORDERED_METATAGS = ("order", "ordfav", "ordpool", "ordfavgroup", "random", "limit")
+
+# 值区分大小写的元标签：只小写名称部分
+CASE_SENSITIVE_METATAGS = ("source", "commentary", "note", "comment", "description", "search")
+
+# 出现这些条件时条件之间存在分组或运算关系，只做空白与大小写规范化；
+# 按单个条件判断，saber_(fate) 这类带限定词的标签不算分组
+_GROUP_PREFIXES = ("(", "-(", "~(")
+_OPERATOR_WORDS = ("or", "and")
+
+
+def _is_grouping(term: str) -> bool:
+    return term == ")" or term.startswith(_GROUP_PREFIXES) or '"' in term
+
+
+def _metatag_name(term: str) -> str:
+    name, sep, _ = term.lstrip("-~").partition(":")
+    return name.lower() if sep else ""
+
+
+def _normalize_term(term: str) -> str:
+    name = _metatag_name(term)
+    if name in CASE_SENSITIVE_METATAGS:
+        prefix, _, value = term.partition(":")
+        return f"{prefix.lower()}:{value}"
+    return term.lower()
+
+
+def canonicalize_tag_query(query: str) -> str:
+    """规范化标签查询
+
+    - 统一小写（source: 等区分大小写的元标签只小写名称）、合并空白、去重；
+    - 普通标签与元标签按字典序排序（Danbooru 中它们的先后顺序不影响结果）；
+    - order: / random: / limit: 等保持原有相对顺序并放在最后；
+    - 含括号分组、引号或 or/and 运算时不改变顺序。
+    """
+    if not query:
+        return ""
+    terms = [_normalize_term(term) for term in query.split()]
+    if any(_is_grouping(term) or term in _OPERATOR_WORDS for term in terms):
+        return " ".join(terms)
+
+    unordered: List[str] = []
+    ordered: List[str] = []
+    seen = set()
+    for term in terms:
+        if term in seen:
+            continue
+        seen.add(term)
+        if _metatag_name(term) in ORDERED_METATAGS:
+            ordered.append(term)
+        else:
+            unordered.append(term)
+    return " ".join(sorted(unordered) + ordered)
@@ -409,6 +409,10 @@ class EventBus:
         self._global_handlers.clear()
         self._handler_count = 0
     
+    def has_subscribers(self, event_type: str) -> bool:
+        """是否有处理器会收到该类型的事件（含通配符处理器）"""
+        return bool(self._handlers.get(event_type)) or bool(self._global_handlers)
+    
     def get_handlers(self, event_type: str) -> List[HandlerRegistration]:
         """获取指定事件类型的处理器"""
         return self._handlers.get(event_type, []).copy()
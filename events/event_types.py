@@ -332,6 +332,7 @@ class CacheEvent(DanbooruEvent):
     cache_key: str = ""
     cache_action: str = ""  # hit, miss, set, invalidate, clear
     ttl: Optional[int] = None
+    family: str = ""  # 端点族，见 core/cache_policy.py
     
     def __post_init__(self):
         self.event_type = f"cache.{self.cache_action}" if self.cache_action else "cache"
@@ -339,6 +340,7 @@ class CacheEvent(DanbooruEvent):
             "cache_key": self.cache_key,
             "cache_action": self.cache_action,
             "ttl": self.ttl,
+            "family": self.family,
         })
 
 
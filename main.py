@@ -15,13 +15,20 @@ from datetime import datetime
 from typing import Optional, Dict, Any
 import traceback
 import random
+import time
 
 from astrbot.api.event import filter, AstrMessageEvent, MessageEventResult
 from astrbot.api.star import Context, Star
 from astrbot.api import logger
 
 from .core.client import DanbooruClient
-from .core.config import PluginConfig
+from .core.cache_invalidation import CacheInvalidator
+from .core.cache_warmup import CacheWarmer
+from .core.config import PluginConfig, resolve_data_path
+from .core.http_utils import RequestPriority, request_priority
+from .core.image_store import ImageStore
+from .core.image_transcode import ImageTranscoder
+from .core.reachability import ReachabilityCache
 from .core.exceptions import (
     DanbooruError,
     AuthenticationError,
@@ -38,8 +45,9 @@ from .commands.handlers.posts import (
     _build_image_chain,
     _build_text_image_chain,
     _format_tags,
-    _is_image_accessible,
-    _select_image_url,
+    _local_images,
+    _posts_search_limits,
+    _probe_accessible,
 )
 
 
@@ -53,6 +61,8 @@ class DanbooruPlugin(Star):
 
         self.config: Optional[PluginConfig] = None
         self.client: Optional[DanbooruClient] = None
+        self.cache_invalidator: Optional[CacheInvalidator] = None
+        self.cache_warmer: Optional[CacheWarmer] = None
         self.event_bus: Optional[EventBus] = None
         self.services: Optional[ServiceRegistry] = None
         self.handlers: Dict[str, Any] = {}
@@ -75,6 +85,11 @@ class DanbooruPlugin(Star):
                 config=self.config,
                 event_bus=self.event_bus,
             )
+            if self.config.cache.enabled:
+                self.cache_invalidator = CacheInvalidator(
+                    self.client, refresh=self.config.cache.refresh_on_write
+                )
+                self.cache_invalidator.attach(self.event_bus)
 
             self.services = ServiceRegistry.build(self.client, self.event_bus)
             ctx = CommandContext(
@@ -83,11 +98,26 @@ class DanbooruPlugin(Star):
                 services=self.services,
                 help_messages=HELP_MESSAGES,
                 parser=self.parser,
+                image_store=self._create_image_store(),
+                reachability=ReachabilityCache(
+                    ttl=self.config.cache.image_probe_ttl,
+                    negative_ttl=self.config.cache.image_probe_negative_ttl,
+                    host_cooldown=self.config.cache.image_host_cooldown,
+                ),
             )
+            if ctx.image_store and self.config.display.transcode and ImageTranscoder.available():
+                ctx.transcoder = ImageTranscoder(
+                    ctx.image_store,
+                    max_edge=self.config.display.transcode_max_edge,
+                    fmt=self.config.display.transcode_format,
+                    quality=self.config.display.transcode_quality,
+                    workers=self.config.display.transcode_workers,
+                )
             self.command_ctx = ctx
             self.handlers = build_handlers(ctx)
 
             self._start_subscriptions()
+            self._start_cache_warmup()
             logger.info("Danbooru 插件初始化完成")
 
         except Exception as e:
@@ -100,6 +130,13 @@ class DanbooruPlugin(Star):
 
         try:
             await self._stop_subscriptions()
+            if self.cache_warmer:
+                self.cache_warmer.detach()
+                await self.cache_warmer.stop()
+            if self.cache_invalidator:
+                self.cache_invalidator.detach()
+            if self.command_ctx and self.command_ctx.transcoder:
+                self.command_ctx.transcoder.close()
             if self.event_bus:
                 await self.event_bus.stop()
 
@@ -139,6 +176,33 @@ class DanbooruPlugin(Star):
             logger.error(traceback.format_exc())
             yield event.plain_result(f"❌ 发生错误：{detail}")
 
+    def _create_image_store(self) -> Optional[ImageStore]:
+        if not self.config:
+            return None
+        transcode = self.config.display.transcode
+        if transcode and not ImageTranscoder.available():
+            logger.warning("未安装 Pillow，display.transcode 不生效")
+            transcode = False
+        if not self.config.cache.image_store and not transcode:
+            return None
+        return ImageStore(
+            resolve_data_path(self.config.cache.image_store_path),
+            max_bytes=self.config.cache.image_store_max_bytes,
+        )
+
+    async def _run_command(self, name: str, handler: Any, event: AstrMessageEvent, args: str):
+        """执行命令，并记录首条回复耗时与总耗时"""
+        start = time.perf_counter()
+        first: Optional[float] = None
+        try:
+            async for result in handler(event, args):
+                if first is None:
+                    first = time.perf_counter() - start
+                yield result
+        finally:
+            if self.command_ctx:
+                self.command_ctx.stats.record(name, time.perf_counter() - start, first)
+
     def _start_subscriptions(self) -> None:
         if not self.config or not self.config.subscriptions.enabled:
             return
@@ -159,6 +223,37 @@ class DanbooruPlugin(Star):
         self._subscription_tasks = []
         self._subscription_stop = None
 
+    def _start_cache_warmup(self) -> None:
+        if not self.config or not self.client or self.cache_warmer:
+            return
+        cache_config = self.config.cache
+        if not cache_config.enabled or not cache_config.warmup:
+            return
+        self.cache_warmer = CacheWarmer(
+            self.client,
+            endpoints=cache_config.warmup_endpoints,
+            top_n=cache_config.warmup_top_n,
+            usage_path=resolve_data_path("cache/warmup_usage.json"),
+            provider=self._subscription_warmup_targets if cache_config.warmup_subscriptions else None,
+        )
+        self.cache_warmer.load_usage()
+        if self.event_bus:
+            self.cache_warmer.attach(self.event_bus)
+        self.cache_warmer.start()
+
+    async def _subscription_warmup_targets(self) -> list[tuple[str, Dict[str, Any]]]:
+        """订阅标签的首页搜索，与 posts 命令的请求参数一致"""
+        if not self.services or not self.command_ctx:
+            return []
+        groups = await self.services.subscriptions.list_groups()
+        _, pool_limit = _posts_search_limits(self.command_ctx)
+        targets: list[tuple[str, Dict[str, Any]]] = []
+        for group in groups.values():
+            for tag in group.get("tags", {}):
+                tags = _apply_filters(self.command_ctx, tag)
+                targets.append(("posts", {"tags": tags, "limit": min(pool_limit, 200), "page": 1}))
+        return targets
+
     async def _sleep_or_stop(self, seconds: float) -> bool:
         if not self._subscription_stop:
             await asyncio.sleep(seconds)
@@ -214,16 +309,9 @@ class DanbooruPlugin(Star):
                 sent_ids: list[int] = []
 
                 if show_preview or only_image:
-                    selected: list[tuple[dict, str]] = []
-                    for post in posts:
-                        url = _select_image_url(self.command_ctx, post)
-                        if not url:
-                            continue
-                        if not await _is_image_accessible(self.command_ctx, url):
-                            continue
-                        selected.append((post, url))
-                        if len(selected) >= limit:
-                            break
+                    selected = await _probe_accessible(
+                        self.command_ctx, posts, limit, share=limit if only_image else 1
+                    )
                     if selected:
                         post_ids = [post.get("id") for post, _ in selected]
                         new_ids = await self.services.subscriptions.filter_new_post_ids(
@@ -241,8 +329,9 @@ class DanbooruPlugin(Star):
                                 if item[0].get("id") in new_ids
                             ]
                     if selected:
+                        images = await _local_images(self.command_ctx, selected)
                         if only_image:
-                            chain = _build_image_chain([url for _, url in selected])
+                            chain = _build_image_chain(images)
                             if chain and await self._send_chain(session, chain):
                                 sent_ids.extend(
                                     [
@@ -252,7 +341,7 @@ class DanbooruPlugin(Star):
                                     ]
                                 )
                         else:
-                            for post, url in reversed(selected):
+                            for (post, _), image in reversed(list(zip(selected, images))):
                                 score = post.get("score", 0)
                                 fav = post.get("fav_count", 0)
                                 rating = post.get("rating", "?")
@@ -270,7 +359,7 @@ class DanbooruPlugin(Star):
                                     f"🔗 https://danbooru.donmai.us/posts/{post['id']}"
                                 )
                                 text = "\n".join(lines)
-                                chain = _build_text_image_chain(text, url)
+                                chain = _build_text_image_chain(text, image)
                                 if chain and await self._send_chain(session, chain):
                                     post_id = post.get("id")
                                     if post_id is not None:
@@ -365,16 +454,9 @@ class DanbooruPlugin(Star):
             posts = response.data
 
             if show_preview or only_image:
-                selected: list[tuple[dict, str]] = []
-                for post in posts:
-                    url = _select_image_url(self.command_ctx, post)
-                    if not url:
-                        continue
-                    if not await _is_image_accessible(self.command_ctx, url):
-                        continue
-                    selected.append((post, url))
-                    if len(selected) >= candidate_cap:
-                        break
+                selected = await _probe_accessible(
+                    self.command_ctx, posts, candidate_cap, share=limit if only_image else 1
+                )
 
                 if not selected:
                     for group_id, _ in entries:
@@ -402,8 +484,9 @@ class DanbooruPlugin(Star):
                         group_selected = group_selected[:limit]
 
                     sent_ids: list[int] = []
+                    images = await _local_images(self.command_ctx, group_selected)
                     if only_image:
-                        chain = _build_image_chain([url for _, url in group_selected])
+                        chain = _build_image_chain(images)
                         if chain and await self._send_chain(session, chain):
                             sent_ids.extend(
                                 [
@@ -414,7 +497,7 @@ class DanbooruPlugin(Star):
                             )
                     else:
                         total = len(group_selected)
-                        for idx, (post, url) in enumerate(group_selected, 1):
+                        for idx, ((post, _), image) in enumerate(zip(group_selected, images), 1):
                             score = post.get("score", 0)
                             fav = post.get("fav_count", 0)
                             rating = post.get("rating", "?")
@@ -432,7 +515,7 @@ class DanbooruPlugin(Star):
                                 f"🔗 https://danbooru.donmai.us/posts/{post['id']}"
                             )
                             text = "\n".join(lines)
-                            chain = _build_text_image_chain(text, url)
+                            chain = _build_text_image_chain(text, image)
                             if chain and await self._send_chain(session, chain):
                                 post_id = post.get("id")
                                 if post_id is not None:
@@ -497,8 +580,16 @@ class DanbooruPlugin(Star):
                 round_id = 0
                 if self.services:
                     round_id = await self.services.subscriptions.next_dedupe_round()
-                await self._dispatch_tag_subscriptions(round_id)
-                await self._dispatch_popular_subscriptions(round_id)
+                # 订阅请求只占用交互命令空闲的容量
+                with request_priority(RequestPriority.BACKGROUND):
+                    start = time.perf_counter()
+                    await self._dispatch_tag_subscriptions(round_id)
+                    if self.command_ctx:
+                        self.command_ctx.stats.record("subscription:tags", time.perf_counter() - start)
+                    start = time.perf_counter()
+                    await self._dispatch_popular_subscriptions(round_id)
+                    if self.command_ctx:
+                        self.command_ctx.stats.record("subscription:popular", time.perf_counter() - start)
             except Exception as exc:
                 logger.error(f"标签订阅处理失败: {exc}")
             interval = 120
@@ -509,46 +600,47 @@ class DanbooruPlugin(Star):
 
     @filter.command("danbooru")
     async def cmd_main(self, event: AstrMessageEvent):
-        """Danbooru 主命令入口"""
-        message = event.message_str.strip()
-        parts = message.split(maxsplit=2)
+        """Danbooru 主命令入口；命令发出的所有请求都以 interactive 优先级调度"""
+        with request_priority(RequestPriority.INTERACTIVE):
+            message = event.message_str.strip()
+            parts = message.split(maxsplit=2)
 
-        if len(parts) <= 1:
-            yield event.plain_result(HELP_MESSAGES["main"])
-            return
+            if len(parts) <= 1:
+                yield event.plain_result(HELP_MESSAGES["main"])
+                return
 
-        if self.config and not self.config.enable_commands:
-            yield event.plain_result("❌ 当前配置已禁用命令功能")
-            return
+            if self.config and not self.config.enable_commands:
+                yield event.plain_result("❌ 当前配置已禁用命令功能")
+                return
 
-        if not self.handlers:
-            yield event.plain_result("❌ 命令未初始化，请稍后再试")
-            return
+            if not self.handlers:
+                yield event.plain_result("❌ 命令未初始化，请稍后再试")
+                return
 
-        sub_cmd = parts[1].lower() if len(parts) > 1 else ""
-        args = parts[2] if len(parts) > 2 else ""
+            sub_cmd = parts[1].lower() if len(parts) > 1 else ""
+            args = parts[2] if len(parts) > 2 else ""
 
-        handler = self.handlers.get(sub_cmd)
-        if handler:
-            try:
-                async for result in handler(event, args):
-                    yield result
-            except Exception as e:
-                async for result in self._handle_error(event, e):
-                    yield result
-        else:
-            tag_query = " ".join(part for part in [sub_cmd, args] if part).strip()
-            posts_handler = self.handlers.get("posts") if self.handlers else None
-            if posts_handler and tag_query:
+            handler = self.handlers.get(sub_cmd)
+            if handler:
                 try:
-                    async for result in posts_handler(event, tag_query):
+                    async for result in self._run_command(sub_cmd, handler, event, args):
                         yield result
-                    return
                 except Exception as e:
                     async for result in self._handle_error(event, e):
                         yield result
-                    return
-
-            yield event.plain_result(
-                f"❌ 未知命令: {sub_cmd}\n\n使用 `/danbooru help` 查看帮助"
-            )
+            else:
+                tag_query = " ".join(part for part in [sub_cmd, args] if part).strip()
+                posts_handler = self.handlers.get("posts") if self.handlers else None
+                if posts_handler and tag_query:
+                    try:
+                        async for result in self._run_command("posts", posts_handler, event, tag_query):
+                            yield result
+                        return
+                    except Exception as e:
+                        async for result in self._handle_error(event, e):
+                            yield result
+                        return
+
+                yield event.plain_result(
+                    f"❌ 未知命令: {sub_cmd}\n\n使用 `/danbooru help` 查看帮助"
+                )
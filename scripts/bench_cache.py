@@ -0,0 +1,131 @@
+"""
+ResponseCache micro-benchmark.
+Compares the O(1) LRU/TTL cache against the previous sort-on-overflow cache.
+"""
+
+# ruff: noqa: E402
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from importlib import import_module
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+PACKAGE_NAME = ROOT_DIR.name
+PARENT_DIR = ROOT_DIR.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.append(str(PARENT_DIR))
+
+_cache_module = import_module(f"{PACKAGE_NAME}.core.cache")
+ResponseCache = _cache_module.ResponseCache
+make_cache_key = _cache_module.make_cache_key
+
+
+class KeyedResponseCache(ResponseCache):
+    """Current cache behind the legacy call signature: one hashed key per call."""
+
+    async def get(self, method: str, url: str, params: Optional[Dict] = None) -> Optional[Any]:
+        return await super().get(make_cache_key(method, url, params))
+
+    async def set(self, method: str, url: str, value: Any, params: Optional[Dict] = None, ttl: Optional[int] = None) -> None:
+        await super().set(make_cache_key(method, url, params), value, ttl=ttl)
+
+
+class LegacyResponseCache:
+    """Previous implementation: full scan + sort on every insert once full."""
+
+    def __init__(self, max_size: int = 1000, default_ttl: int = 300):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._cache: Dict[str, tuple] = {}
+        self._lock = asyncio.Lock()
+
+    def _generate_key(self, method: str, url: str, params: Optional[Dict] = None) -> str:
+        key_parts = [method.upper(), url]
+        if params:
+            key_parts.append(str(sorted(params.items())))
+        return ":".join(key_parts)
+
+    async def get(self, method: str, url: str, params: Optional[Dict] = None) -> Optional[Any]:
+        key = self._generate_key(method, url, params)
+        async with self._lock:
+            if key in self._cache:
+                value, expires_at = self._cache[key]
+                if datetime.now() < expires_at:
+                    return value
+                del self._cache[key]
+        return None
+
+    async def set(self, method: str, url: str, value: Any, params: Optional[Dict] = None, ttl: Optional[int] = None) -> None:
+        key = self._generate_key(method, url, params)
+        expires_at = datetime.now() + timedelta(seconds=ttl or self.default_ttl)
+        async with self._lock:
+            if len(self._cache) >= self.max_size:
+                await self._cleanup()
+            self._cache[key] = (value, expires_at)
+
+    async def _cleanup(self) -> None:
+        now = datetime.now()
+        expired_keys = [key for key, (_, expires_at) in self._cache.items() if now >= expires_at]
+        for key in expired_keys:
+            del self._cache[key]
+        if len(self._cache) >= self.max_size:
+            sorted_items = sorted(self._cache.items(), key=lambda x: x[1][1])
+            for key, _ in sorted_items[:len(self._cache) - self.max_size + 1]:
+                del self._cache[key]
+
+
+URL = "https://danbooru.donmai.us/posts.json"
+
+
+def _params(i: int) -> Dict[str, Any]:
+    return {"tags": f"tag_{i}", "limit": 20}
+
+
+async def _fill(cache, size: int) -> None:
+    for i in range(size):
+        await cache.set("GET", URL, i, _params(i))
+
+
+async def _bench(cache, size: int, seconds: float) -> Dict[str, float]:
+    """Measure get-hit and set-with-eviction throughput on a full cache."""
+    await _fill(cache, size)
+
+    ops = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            await cache.get("GET", URL, _params(ops % size))
+            ops += 1
+    get_rate = ops / (time.perf_counter() - start)
+
+    ops = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        await cache.set("GET", URL, ops, _params(size + ops))
+        ops += 1
+    set_rate = ops / (time.perf_counter() - start)
+    return {"get": get_rate, "set": set_rate}
+
+
+async def main(sizes: List[int], seconds: float) -> None:
+    print(f"{'entries':>8} | {'impl':<7} | {'get ops/s':>12} | {'set ops/s':>12}")
+    print("-" * 50)
+    for size in sizes:
+        for name, factory in (("legacy", LegacyResponseCache), ("lru", KeyedResponseCache)):
+            result = await _bench(factory(max_size=size, default_ttl=300), size, seconds)
+            print(f"{size:>8} | {name:<7} | {result['get']:>12,.0f} | {result['set']:>12,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ResponseCache micro-benchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma separated entry counts")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per measurement")
+    args = parser.parse_args()
+    asyncio.run(main([int(s) for s in args.sizes.split(",") if s], args.seconds))
@@ -0,0 +1,114 @@
+"""
+ResponseCache trace replay.
+Replays a sequence of GET requests through the cache with and without the
+W-TinyLFU admission filter and reports the hit ratio of each.
+
+The trace is either a plugin log captured with `log_api_calls` enabled
+(lines like `[danbooru] GET posts params={...} body=None cache=True`) or,
+when no file is given, a synthetic mix of Zipf-distributed interactive
+searches interleaved with subscription rounds of one-off `id:>N` queries.
+"""
+
+# ruff: noqa: E402
+
+import argparse
+import ast
+import asyncio
+import random
+import re
+import sys
+from importlib import import_module
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+PACKAGE_NAME = ROOT_DIR.name
+PARENT_DIR = ROOT_DIR.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.append(str(PARENT_DIR))
+
+_cache_module = import_module(f"{PACKAGE_NAME}.core.cache")
+ResponseCache = _cache_module.ResponseCache
+make_cache_key = _cache_module.make_cache_key
+canonicalize_tag_query = import_module(f"{PACKAGE_NAME}.core.tag_query").canonicalize_tag_query
+
+LOG_LINE = re.compile(r"\[danbooru\] GET (?P<endpoint>\S+) params=(?P<params>\{.*?\}|None) body=")
+
+Request = Tuple[str, Optional[Dict[str, Any]]]
+
+
+def read_log_trace(path: Path) -> List[Request]:
+    """Extract GET requests from a plugin log."""
+    requests: List[Request] = []
+    with path.open(encoding="utf-8", errors="replace") as fh:
+        for line in fh:
+            match = LOG_LINE.search(line)
+            if not match:
+                continue
+            try:
+                params = ast.literal_eval(match.group("params"))
+            except (ValueError, SyntaxError):
+                continue
+            requests.append((match.group("endpoint"), params if isinstance(params, dict) else None))
+    return requests
+
+
+def synthetic_trace(length: int, hot_keys: int, subscriptions: int, seed: int) -> List[Request]:
+    """Zipf interactive traffic with periodic subscription polling bursts."""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(hot_keys)]
+    requests: List[Request] = []
+    last_seen = 0
+    while len(requests) < length:
+        for rank in rng.choices(range(hot_keys), weights=weights, k=1000):
+            requests.append(("posts", {"tags": f"tag_{rank}", "limit": 20}))
+        last_seen += 1
+        for sub in range(subscriptions):
+            requests.append(("posts", {"tags": f"sub_{sub} id:>{last_seen * 1000 + sub}", "limit": 100}))
+    return requests[:length]
+
+
+def _keys(requests: List[Request]) -> Iterator[str]:
+    for endpoint, params in requests:
+        if params and isinstance(params.get("tags"), str):
+            params = {**params, "tags": canonicalize_tag_query(params["tags"])}
+        yield make_cache_key("GET", endpoint, params)
+
+
+async def replay(keys: List[str], size: int, admission: bool) -> Dict[str, Any]:
+    cache = ResponseCache(max_size=size, default_ttl=10 ** 9, admission=admission)
+    hits = 0
+    for key in keys:
+        if await cache.get(key) is not None:
+            hits += 1
+        else:
+            await cache.set(key, True, size=1024)
+    stats = cache.get_stats()
+    return {"hit_ratio": hits / len(keys) if keys else 0.0, "rejections": stats["admission_rejections"]}
+
+
+async def main(requests: List[Request], sizes: List[int]) -> None:
+    keys = list(_keys(requests))
+    print(f"requests: {len(keys)}, distinct keys: {len(set(keys))}")
+    print(f"{'entries':>8} | {'policy':<8} | {'hit ratio':>9} | {'rejected':>9}")
+    print("-" * 44)
+    for size in sizes:
+        for name, admission in (("lru", False), ("tinylfu", True)):
+            result = await replay(keys, size, admission)
+            print(f"{size:>8} | {name:<8} | {result['hit_ratio']:>9.2%} | {result['rejections']:>9,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ResponseCache trace replay")
+    parser.add_argument("trace", nargs="?", help="plugin log recorded with log_api_calls enabled")
+    parser.add_argument("--sizes", default="200,1000", help="comma separated cache sizes")
+    parser.add_argument("--length", type=int, default=200000, help="synthetic trace length")
+    parser.add_argument("--hot-keys", type=int, default=5000, help="synthetic interactive key space")
+    parser.add_argument("--subscriptions", type=int, default=300, help="synthetic one-off queries per round")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.trace:
+        trace = read_log_trace(Path(args.trace))
+    else:
+        trace = synthetic_trace(args.length, args.hot_keys, args.subscriptions, args.seed)
+    asyncio.run(main(trace, [int(s) for s in args.sizes.split(",") if s]))
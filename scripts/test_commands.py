@@ -315,6 +315,7 @@ async def run_tests(args: argparse.Namespace) -> int:
             ("autocomplete", tag_prefix, True),
             ("count", samples["tag_name"], False),
             ("status", "", False),
+            ("cache", "stats", False),
             ("similar", str(samples["post_id"]), True),
             ("api", "posts?limit=1", False),
             ("call", "services", False),
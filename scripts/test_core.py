@@ -0,0 +1,130 @@
+"""
+Core unit checks for the AstrBot Danbooru plugin.
+Runs offline (no network); usable with pytest or as `python scripts/test_core.py`.
+"""
+
+# ruff: noqa: E402
+
+import asyncio
+import sqlite3
+import sys
+import tempfile
+import time
+from importlib import import_module
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+PACKAGE_NAME = ROOT_DIR.name
+PARENT_DIR = ROOT_DIR.parent
+if str(PARENT_DIR) not in sys.path:
+    sys.path.append(str(PARENT_DIR))
+
+canonicalize_tag_query = import_module(f"{PACKAGE_NAME}.core.tag_query").canonicalize_tag_query
+_http_utils = import_module(f"{PACKAGE_NAME}.core.http_utils")
+ResponseCache = import_module(f"{PACKAGE_NAME}.core.cache").ResponseCache
+RateLimiter = _http_utils.RateLimiter
+RequestPriority = _http_utils.RequestPriority
+shared_state = import_module(f"{PACKAGE_NAME}.core.shared_state")
+
+
+def test_tag_query_sorts_and_dedups() -> None:
+    assert canonicalize_tag_query("Rating:g  1girl 1girl") == "1girl rating:g"
+    assert canonicalize_tag_query("order:score solo") == "solo order:score"
+
+
+def test_tag_query_qualifier_tags_are_not_grouping() -> None:
+    expected = "rating:g saber_(fate)"
+    assert canonicalize_tag_query("saber_(fate) rating:g") == expected
+    assert canonicalize_tag_query("rating:g saber_(fate)") == expected
+    assert canonicalize_tag_query("-hatsune_miku_(append) 1girl") == "-hatsune_miku_(append) 1girl"
+
+
+def test_tag_query_keeps_grouped_order() -> None:
+    assert canonicalize_tag_query("solo ( a or b )") == "solo ( a or b )"
+    assert canonicalize_tag_query("solo -(a b)") == "solo -(a b)"
+    assert canonicalize_tag_query("solo ~(a b)") == "solo ~(a b)"
+    assert canonicalize_tag_query('solo "a b"') == 'solo "a b"'
+
+
+def test_cache_admission_rejection_is_not_an_eviction() -> None:
+    async def scenario() -> None:
+        cache = ResponseCache(max_size=200)
+        for index in range(cache.max_size):
+            await cache.set(f"hot-{index}", [index], weight=3, family="tags")
+        # Fixed frequencies keep the check independent of sketch hash collisions.
+        cache._sketch.frequency = lambda key: 5 if key.startswith("hot-") else 1
+        head = next(iter(cache._main))
+        chances = cache._cache[head].chances
+        for index in range(500):
+            await cache.set(f"once-{index}", [index], family="posts")
+        stats = cache.get_stats()
+        assert stats["admission_rejections"] > 0
+        assert stats["evictions"] == 0
+        assert next(iter(cache._main)) == head and cache._cache[head].chances == chances
+
+    asyncio.run(scenario())
+
+
+def test_rate_limiter_interactive_skips_background_claims() -> None:
+    async def scenario() -> float:
+        limiter = RateLimiter(requests_per_second=2)
+        background = [asyncio.ensure_future(limiter.acquire(RequestPriority.BACKGROUND)) for _ in range(20)]
+        await asyncio.sleep(0.1)
+        start = time.perf_counter()
+        await limiter.acquire(RequestPriority.INTERACTIVE)
+        waited = time.perf_counter() - start
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        return waited
+
+    # Background drains the 2-token burst; interactive then waits for one token (0.5s), not behind 18 claims.
+    assert asyncio.run(scenario()) < 1.0
+
+
+def test_shared_rate_limiter_recovers_after_error() -> None:
+    async def scenario() -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            limiter = shared_state.SharedRateLimiter(f"{tmp}/shared.sqlite3", "test", requests_per_second=50)
+            update_sync = limiter._update_sync
+            failures = [sqlite3.OperationalError("database is locked")]
+
+            def flaky(*args, **kwargs):
+                if failures:
+                    raise failures.pop()
+                return update_sync(*args, **kwargs)
+
+            limiter._update_sync = flaky
+            retry_after = shared_state.RETRY_SHARED_AFTER
+            shared_state.RETRY_SHARED_AFTER = 0.2
+            try:
+                await limiter.acquire()
+                assert limiter.get_stats()["shared"] is False
+                await asyncio.sleep(0.3)
+                await limiter.acquire()
+                stats = limiter.get_stats()
+                assert stats["shared"] is True and stats["fallbacks"] == 1
+            finally:
+                shared_state.RETRY_SHARED_AFTER = retry_after
+                await limiter.close()
+
+    asyncio.run(scenario())
+
+
+def main() -> int:
+    tests = [(name, func) for name, func in globals().items() if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+        except AssertionError as exc:
+            failed += 1
+            print(f"FAIL {name}: {exc!r}")
+        else:
+            print(f"ok   {name}")
+    print(f"{len(tests) - failed}/{len(tests)} passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
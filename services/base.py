@@ -82,6 +82,7 @@ class BaseService(ABC):
         self,
         resource_id: int,
         endpoint: str = "",
+        refresh: bool = False,
     ) -> APIResponse:
         """
         获取单个资源
@@ -89,12 +90,13 @@ class BaseService(ABC):
         Args:
             resource_id: 资源ID
             endpoint: 端点路径
+            refresh: 跳过缓存（含陈旧条目与实体缓存）直接读取上游，用于读-改-写
         
         Returns:
             API响应
         """
         full_endpoint = self._build_endpoint(endpoint, str(resource_id))
-        return await self.client.get(full_endpoint)
+        return await self.client.get(full_endpoint, refresh=refresh)
     
     async def _create(
         self,
@@ -157,17 +157,18 @@ class FavoritesService(BaseService):
             params=self._apply_pagination(params, pagination)
         )
     
-    async def get_group(self, group_id: int) -> APIResponse:
+    async def get_group(self, group_id: int, refresh: bool = False) -> APIResponse:
         """
         获取单个收藏组
         
         Args:
             group_id: 收藏组ID
+            refresh: 跳过缓存直接读取上游
         
         Returns:
             收藏组详情响应
         """
-        return await self.client.get(f"favorite_groups/{group_id}")
+        return await self.client.get(f"favorite_groups/{group_id}", refresh=refresh)
     
     async def create_group(
         self,
@@ -265,12 +266,12 @@ class FavoritesService(BaseService):
         Returns:
             移除响应
         """
-        # 获取当前帖子列表并移除指定帖子
-        group_response = await self.get_group(group_id)
+        # 获取当前帖子列表并移除指定帖子（读-改-写，必须读取上游最新数据，不能使用缓存副本）
+        group_response = await self.get_group(group_id, refresh=True)
         if not group_response.success:
             return group_response
         
-        current_post_ids = group_response.data.get("post_ids", [])
+        current_post_ids = list(group_response.data.get("post_ids", []))
         if post_id in current_post_ids:
             current_post_ids.remove(post_id)
         
@@ -82,17 +82,18 @@ class PoolsService(VersionedService):
         
         return response
     
-    async def get(self, pool_id: int) -> APIResponse:
+    async def get(self, pool_id: int, refresh: bool = False) -> APIResponse:
         """
         获取单个图池
         
         Args:
             pool_id: 图池ID
+            refresh: 跳过缓存直接读取上游
         
         Returns:
             图池详情响应
         """
-        response = await self._get(pool_id)
+        response = await self._get(pool_id, refresh=refresh)
         
         if response.success:
             await self._emit_event(PoolEvent(
@@ -257,12 +258,12 @@ class PoolsService(VersionedService):
         Returns:
             移除响应
         """
-        # 获取当前帖子列表并移除指定帖子
-        pool_response = await self.get(pool_id)
+        # 获取当前帖子列表并移除指定帖子（读-改-写，必须读取上游最新数据，不能使用缓存副本）
+        pool_response = await self.get(pool_id, refresh=True)
         if not pool_response.success:
             return pool_response
         
-        current_post_ids = pool_response.data.get("post_ids", [])
+        current_post_ids = list(pool_response.data.get("post_ids", []))
         if post_id in current_post_ids:
             current_post_ids.remove(post_id)
         